@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+"""
+asyncio-native evaluation. Lisp code run through
+:meth:`AsyncInterpreter.eval_async` may suspend on Python awaitables with
+``(await expr)``, letting many Lisp tasks share a single event loop.
+
+Every evaluation runs on a shallow copy of the interpreter, so tasks share
+the global environment but each has its own environment stack and current
+continuation. Forms without an async implementation, and procedures called
+back from Python code, are evaluated synchronously and cannot await.
+"""
+from __future__ import absolute_import, division, print_function
+
+import copy
+
+from . import loops
+from . import types
+from .interpreter import Interpreter, special
+from .types import Procedure, Continuation
+from .utils import MethodDict
+
+
+class AsyncInterpreter(Interpreter):
+
+    lookup = MethodDict(Interpreter.lookup)
+    async_lookup = MethodDict()
+    # Interpreter methods (by function) -> coroutine implementations
+    asyncs = MethodDict()
+
+    def __init__(self, env=None):
+        super().__init__(env)
+        self._envs['await'] = self._defaults['await'] = self.await_
+
+    @special
+    def await_(self, expr):
+        raise RuntimeError("'await' outside of async evaluation")
+
+    async def eval_async(self, obj):
+        return await copy.copy(self)._eval(obj)
+
+    async def _eval(self, obj):
+        evaluator = self.async_lookup.get(type(obj))
+
+        if evaluator:
+            return await evaluator(self, obj)
+
+        return self.eval(obj)
+
+    def _rebind(self, fun):
+        # Builtins are bound to the interpreter that created the global
+        # environment, run them against this task instead
+        owner = getattr(fun, '__self__', None)
+
+        if owner is not self and isinstance(owner, Interpreter):
+            return fun.__func__.__get__(self)
+
+        return fun
+
+    @lookup.annotate(types.Symbol)
+    def symbol(self, symbol):
+        # Also on the synchronous path, so that builtins called back from
+        # Python, like the procedure given to stream-map, run on this task
+        return self._rebind(Interpreter.symbol(self, symbol))
+
+    async def _eval_args(self, values):
+        return [await self._eval(v) for v in values]
+
+    @async_lookup.annotate(types.Cons)
+    async def expr_async(self, cons):
+        values = (c.car for c in cons)
+        fun = await self._eval(next(values))
+
+        if isinstance(fun, Procedure):
+            args = await self._eval_args(values)
+            return await self._call_procedure_async(fun, *args)
+
+        elif isinstance(fun, Continuation):
+            return await self._run_continuation_async(copy.copy(fun))
+
+        special_ = getattr(fun, '_special', False)
+        impl = self.asyncs.get(getattr(fun, '__func__', None))
+
+        if impl is not None:
+            if special_:
+                return await impl(self, *values)
+
+            return await impl(self, *await self._eval_args(values))
+
+        if special_:
+            return fun(*values)
+
+        return fun(*await self._eval_args(values))
+
+    @asyncs.annotate(await_)
+    async def await_async(self, expr):
+        return await (await self._eval(expr))
+
+    @asyncs.annotate(Interpreter.eval)
+    async def eval_builtin_async(self, obj):
+        return await self._eval(obj)
+
+    @asyncs.annotate(Interpreter.begin)
+    async def begin_async(self, *exprs):
+        value = None
+
+        for expr in exprs:
+            value = await self._eval(expr)
+
+        return value
+
+    @asyncs.annotate(Interpreter.if_)
+    async def if_async(self, pred, then, else_=None):
+        if await self._eval(pred):
+            return await self._eval(then)
+
+        else:
+            return await self._eval(else_)
+
+    @asyncs.annotate(Interpreter.define)
+    async def define_async(self, symbol, *value):
+        if isinstance(symbol, types.Cons):
+            return self.define(symbol, *value)
+
+        self._envs[symbol.name] = await self._eval(value[0])
+
+    @asyncs.annotate(Interpreter.setbang)
+    async def setbang_async(self, symbol, value):
+        if not isinstance(symbol, types.Symbol):
+            raise TypeError("{!r} is not a symbol".format(symbol))
+
+        for env in self._envs.maps:
+            if symbol.name in env:
+                env[symbol.name] = await self._eval(value)
+                return
+
+        raise NameError("'{}' not defined".format(symbol))
+
+    @asyncs.annotate(Interpreter.let)
+    async def let_async(self, defs, *body):
+        if loops.is_named_let(defs):
+            return await self._named_let_async(
+                *loops.named_let(defs, body[0], body[1:]))
+
+        env = self._envs.new_child()
+
+        with self.over(env):
+            for d in loops.items(defs):
+                symbol = d.car
+                value = d.cdr.car
+                env[symbol.name] = await self._eval(value)
+
+            return await self._run_continuation_async(Continuation(env, body))
+
+    async def _named_let_async(self, name, vars_, inits, body):
+        values = await self._eval_args(inits)
+
+        if not loops.tail_only(name, body) or loops.captures(body):
+            env = self._envs.new_child()
+            env[name] = Procedure(types.Symbol(name), tuple(vars_),
+                                  tuple(body), env)
+
+            with self.over(env):
+                return await self._call_procedure_async(env[name], *values)
+
+        frame = dict(zip(vars_, values))
+
+        with self.over(self._envs.new_child(frame)):
+            while True:
+                if self._budget is not None:
+                    self._budget.step()
+
+                value = await self._loop_body_async(body, name)
+
+                if type(value) is not types.Recur:
+                    return value
+
+                for var, arg in zip(vars_, value.args):
+                    frame[var] = arg
+
+    async def _loop_body_async(self, body, name):
+        for expr in body[:-1]:
+            await self._eval(expr)
+
+        expr = body[-1]
+
+        while isinstance(expr, types.Cons):
+            values = loops.items(expr)
+            head = loops.name_of(values[0])
+
+            if head == name:
+                return types.Recur(await self._eval_args(values[1:]))
+
+            elif head == 'if':
+                expr = values[2] if await self._eval(values[1]) else (
+                    values[3] if len(values) > 3 else None)
+
+            elif head == 'begin' and len(values) > 1:
+                for value in values[1:-1]:
+                    await self._eval(value)
+
+                expr = values[-1]
+
+            elif head == 'let' and not loops.is_named_let(values[1]):
+                env = self._envs.new_child()
+
+                with self.over(env):
+                    for d in loops.items(values[1]):
+                        env[d.car.name] = await self._eval(d.cdr.car)
+
+                    return await self._loop_body_async(values[2:], name)
+
+            else:
+                break
+
+        return await self._eval(expr)
+
+    @asyncs.annotate(Interpreter.do)
+    async def do_async(self, specs, clause, *body):
+        vars_, inits, steps, test, results, body = loops.do(
+            specs, clause, body)
+        frame = dict(zip(vars_, await self._eval_args(inits)))
+        steps = [(var, step) for var, step in zip(vars_, steps)
+                 if step is not None]
+        fresh = loops.captures(body + [step for _, step in steps] + [test])
+        outer = self._envs
+
+        with self.over(outer.new_child(frame)):
+            while not await self._eval(test):
+                for expr in body:
+                    await self._eval(expr)
+
+                values = await self._eval_args(step for _, step in steps)
+
+                if fresh:
+                    frame = dict(frame)
+                    self._envs = outer.new_child(frame)
+
+                for (var, _), value in zip(steps, values):
+                    frame[var] = value
+
+            value = None
+
+            for expr in results:
+                value = await self._eval(expr)
+
+            return value
+
+    async def _call_procedure_async(self, proc, *args):
+        if len(proc.args) != len(args):
+            raise TypeError('expected {} arguments, got {}'.format(
+                len(proc.args), len(args)))
+
+        env = self._envs.new_child(
+            proc.env
+        ).new_child(
+            dict(zip(proc.args, args))
+        )
+
+        continuation = Continuation(env, proc.body)
+        return await self._run_continuation_async(continuation)
+
+    async def _run_continuation_async(self, continuation):
+        value = continuation
+
+        while isinstance(value, Continuation):
+            self._currcontinuation = cc = value
+
+            with self.over(cc.env):
+                pc = cc.next
+                exprs = cc.exprs[pc:]
+
+                for cc.next, expr in enumerate(exprs, pc + 1):
+                    value = await self._eval(expr)
+
+        return value
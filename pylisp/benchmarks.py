@@ -0,0 +1,359 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function
+
+import time
+
+
+def _report(name, seconds, **extra):
+    details = ''.join(' {}={}'.format(k, v) for k, v in extra.items())
+    print('{:<40} {:10.4f}s{}'.format(name, seconds, details))
+
+
+def bench_async_tasks(ntasks=10000, latency=0.01):
+    """
+    Run ``ntasks`` concurrent Lisp tasks, each awaiting a fake async
+    service that sleeps for ``latency`` seconds.
+    """
+    import asyncio
+    from .aio import AsyncInterpreter
+    from .compiler import Compiler
+    from . import types
+
+    async def fetch(n):
+        await asyncio.sleep(latency)
+        return n * 2
+
+    interpreter = AsyncInterpreter()
+    interpreter._envs['fetch'] = fetch
+    interpreter.eval(Compiler("""
+        (define handle
+          (lambda (n)
+            (+ 1 (await (fetch n)))))
+    """).compile())
+
+    async def run():
+        return await asyncio.gather(*(
+            interpreter.eval_async(types.Cons(
+                types.Symbol('handle'), types.Cons(n)))
+            for n in range(ntasks)
+        ))
+
+    start = time.perf_counter()
+    results = asyncio.run(run())
+    elapsed = time.perf_counter() - start
+
+    assert results == [n * 2 + 1 for n in range(ntasks)]
+    _report('async: {} concurrent tasks'.format(ntasks), elapsed,
+            sequential_estimate='{:.1f}s'.format(ntasks * latency))
+
+
+def bench_image_startup(ndefines=500, repeat=5):
+    """
+    Compare interpreter startup from library source against startup from
+    a saved image of the same library.
+    """
+    import os
+    import tempfile
+    from .interpreter import Interpreter
+    from .compiler import Compiler
+
+    source = '\n'.join(
+        '(define (f{0} x) (if (<= x 0) {0} (+ x (f{0} (- x 1)))))\n'
+        '(define v{0} (quote (a b c {0})))'.format(n)
+        for n in range(ndefines)
+    )
+
+    def from_source():
+        interpreter = Interpreter()
+        interpreter.eval(Compiler(source).compile())
+        return interpreter
+
+    fd, path = tempfile.mkstemp(suffix='.img')
+    os.close(fd)
+
+    try:
+        from_source().save_image(path)
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            from_source()
+        source_time = (time.perf_counter() - start) / repeat
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            Interpreter.load_image(path)
+        image_time = (time.perf_counter() - start) / repeat
+
+        size = os.path.getsize(path)
+
+    finally:
+        os.unlink(path)
+
+    _report('startup: source ({} defines)'.format(ndefines), source_time)
+    _report('startup: image ({} bytes)'.format(size), image_time,
+            speedup='{:.1f}x'.format(source_time / image_time))
+
+
+def bench_server(nrequests=2000, concurrency=16, pool_size=4):
+    """
+    Latency and throughput of the evaluation server over a Unix socket.
+    """
+    import asyncio
+    import os
+    import tempfile
+    from .server import Pool, Server, load, summarize
+
+    path = os.path.join(tempfile.mkdtemp(), 'pylisp.sock')
+
+    async def run():
+        pool = Pool(pool_size, source='(define (square x) (* x x))')
+        server = await Server(pool).start(path=path)
+
+        async with server:
+            result = await load(
+                [{'call': 'square', 'args': [n]} for n in range(nrequests)],
+                concurrency, path=path)
+
+        pool.close()
+        return result
+
+    try:
+        latencies, elapsed = asyncio.run(run())
+
+    finally:
+        os.unlink(path)
+        os.rmdir(os.path.dirname(path))
+
+    stats = summarize(latencies, elapsed)
+    _report('server: {} requests'.format(nrequests), elapsed,
+            rps='{:.0f}'.format(stats['rps']),
+            p50_ms='{:.2f}'.format(stats['p50_ms']),
+            p99_ms='{:.2f}'.format(stats['p99_ms']))
+
+
+def bench_tiered(n=20):
+    """
+    Naive fib with and without promotion of hot procedures to Python.
+    """
+    from .interpreter import Interpreter
+    from .compiler import Compiler
+
+    source = Compiler("""
+        (define (fib n) (if (< n 2) n (+ (fib (- n 1)) (fib (- n 2)))))
+        (fib {})
+    """.format(n)).compile()
+
+    for threshold in (None, Interpreter.tier_threshold):
+        interpreter = Interpreter()
+        interpreter.tier_threshold = threshold
+        start = time.perf_counter()
+        interpreter.eval(source)
+        _report('tiered: fib {} threshold={}'.format(n, threshold),
+                time.perf_counter() - start,
+                promoted=len(interpreter.promoted))
+
+
+def bench_limits(n=20, repeat=3):
+    """
+    Overhead of evaluation limit checks, with no budget installed, with an
+    empty budget and with fuel and a deadline.
+    """
+    from .interpreter import Interpreter
+    from .compiler import Compiler
+    from contextlib import nullcontext
+
+    interpreter = Interpreter()
+    interpreter.tier_threshold = None
+    interpreter.eval(Compiler("""
+        (define (fib n) (if (< n 2) n (+ (fib (- n 1)) (fib (- n 2)))))
+    """).compile())
+    call = Compiler('(fib {})'.format(n)).compile()
+
+    cases = (
+        ('none', nullcontext),
+        ('empty budget', interpreter.limits),
+        ('fuel+deadline', lambda: interpreter.limits(
+            fuel=10 ** 9, timeout=3600)),
+    )
+
+    for name, limits in cases:
+        start = time.perf_counter()
+
+        for _ in range(repeat):
+            with limits():
+                interpreter.eval(call)
+
+        _report('limits: fib {} {}'.format(n, name),
+                (time.perf_counter() - start) / repeat)
+
+
+def _sample_data(nrecords):
+    from . import lazy
+    from . import types
+
+    return [
+        lazy.to_list([types.Symbol('record'), n, 'name {}'.format(n), n / 7,
+                      lazy.to_list([types.Symbol('tag'), types.Symbol('a'),
+                                    n * 10 ** 20])])
+        for n in range(nrecords)
+    ]
+
+
+def bench_binary(nrecords=5000):
+    """
+    Binary serialization round-trip against printing and re-parsing text,
+    one top-level form per record.
+    """
+    from . import binary
+    from .compiler import Compiler
+    from .printer import to_string
+
+    records = _sample_data(nrecords)
+
+    start = time.perf_counter()
+    text = '\n'.join(map(to_string, records))
+    Compiler(text).compile()
+    _report('serialize: text round-trip', time.perf_counter() - start,
+            bytes=len(text.encode('utf-8')))
+
+    start = time.perf_counter()
+    encoded = binary.dumps(*records)
+    list(binary.Reader(memoryview(encoded)))
+    _report('serialize: binary round-trip', time.perf_counter() - start,
+            bytes=len(encoded))
+
+
+def bench_ports(nlines=20000):
+    """
+    Building a report line by line through an output string port against
+    repeated string concatenation.
+    """
+    from .interpreter import Interpreter
+    from .compiler import Compiler
+
+    cases = (
+        ('string port', """
+            (with-output-to-string
+              (lambda ()
+                (stream->list
+                  (stream-map (lambda (i) (write-string "a line of report\n"))
+                              (range {})))))
+        """),
+        ('concatenation', """
+            (define report (str))
+            (stream->list
+              (stream-map
+                (lambda (i) (set! report (str.__add__ report "a line of report\n")))
+                (range {})))
+            report
+        """),
+    )
+
+    for name, source in cases:
+        code = Compiler(source.format(nlines)).compile()
+        start = time.perf_counter()
+        report = Interpreter().eval(code)
+        _report('ports: {} lines, {}'.format(nlines, name),
+                time.perf_counter() - start, chars=len(report))
+
+
+def bench_records(nrecords=1000000):
+    """
+    Memory of records against the equivalent cons lists, (point x y z).
+    """
+    import tracemalloc
+    from .interpreter import Interpreter
+    from .compiler import Compiler
+    from . import types
+
+    interpreter = Interpreter()
+    interpreter.eval(Compiler("""
+        (define-record-type point (make-point x y z) point?
+          (x point-x) (y point-y) (z point-z))
+    """).compile())
+    make_point = interpreter._globals['make-point']
+    tag = types.Symbol('point')
+
+    cases = (
+        ('cons list', lambda n: interpreter.list(tag, n, n, n)),
+        ('record', lambda n: make_point(n, n, n)),
+    )
+
+    for name, make in cases:
+        tracemalloc.start()
+        start = time.perf_counter()
+        data = [make(n) for n in range(nrecords)]
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del data
+        _report('records: {} x {}'.format(nrecords, name), elapsed,
+                peak_mb='{:.1f}'.format(peak / 2 ** 20))
+
+
+def bench_views(nrows=1000000):
+    """
+    Passing a Python list into Lisp and back, as conses built up front
+    against a sequence view.
+    """
+    from . import lazy
+    from . import views
+
+    rows = list(range(nrows))
+
+    for name, into in (('conses', lazy.to_list), ('view', views.view)):
+        start = time.perf_counter()
+        lst = into(rows)
+        back = views.to_python(lst)
+        _report('views: {} rows via {}'.format(nrows, name),
+                time.perf_counter() - start)
+        assert back == rows
+
+
+def bench_loops(n=10**7):
+    """
+    A counting do loop, interpreted and compiled to a Python while loop.
+    The interpreter runs a tenth of the iterations.
+    """
+    from .interpreter import Interpreter
+    from .compiler import Compiler, PyCompiler
+
+    source = """
+        (define (count n) (do ((i 0 (+ i 1))) ((= i n) i)))
+        (count {})
+    """
+
+    for threshold, iterations in ((None, n // 10), (1, n)):
+        interpreter = Interpreter()
+        interpreter.tier_threshold = threshold
+        code = Compiler(source.format(iterations)).compile()
+        start = time.perf_counter()
+        interpreter.eval(code)
+        elapsed = time.perf_counter() - start
+        _report('loops: do threshold={}'.format(threshold), elapsed,
+                ns_per_iteration=round(elapsed / iterations * 1e9))
+
+    namespace = dict(Interpreter()._globals)
+    code = PyCompiler(source.format(n)).compile()
+    start = time.perf_counter()
+    exec(code, namespace)
+    elapsed = time.perf_counter() - start
+    _report('loops: do pycompiler', elapsed,
+            ns_per_iteration=round(elapsed / n * 1e9))
+
+
+def benchmarks():
+    bench_async_tasks()
+    bench_image_startup()
+    bench_server()
+    bench_tiered()
+    bench_limits()
+    bench_binary()
+    bench_ports()
+    bench_records()
+    bench_views()
+    bench_loops()
+
+
+if __name__ == '__main__':
+    benchmarks()
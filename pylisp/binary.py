@@ -0,0 +1,331 @@
+# -*- coding: utf-8 -*-
+"""
+Compact binary encoding of pylisp data.
+
+A stream starts with :data:`MAGIC` followed by any number of forms. Each
+value is a one byte tag and a payload; integers and lengths are varints.
+Symbols are written by name once per stream and by index afterwards.
+Proper and improper lists are written flat, as an item count, the items
+and the final cdr, so long lists do not recurse.
+"""
+from __future__ import absolute_import, division, print_function
+
+import mmap
+import struct
+
+from .types import Cons, Symbol
+from .views import SeqView
+from .utils import MethodDict
+
+MAGIC = b'PLB\x01'
+
+NIL = b'n'
+TRUE = b't'
+FALSE = b'f'
+INT = b'i'
+BIGINT = b'I'
+FLOAT = b'd'
+STR = b's'
+SYMBOL = b'y'
+SYMBOL_REF = b'Y'
+LIST = b'l'
+VECTOR = b'v'
+
+_double = struct.Struct('<d')
+_INT_MIN = -1 << 63
+_INT_MAX = 1 << 63
+
+
+def _varint(n):
+    out = bytearray()
+
+    while n > 0x7f:
+        out.append((n & 0x7f) | 0x80)
+        n >>= 7
+
+    out.append(n)
+    return out
+
+
+class Writer(object):
+    """
+    Writes forms to a binary file object.
+    """
+
+    writers = MethodDict()
+
+    def __init__(self, file):
+        self.file = file
+        self.symbols = {}
+        self._out = bytearray()
+        # Cells of the lists being written, to detect cycles
+        self._path = set()
+        file.write(MAGIC)
+
+    def write(self, obj):
+        try:
+            self._write(obj)
+            self.file.write(self._out)
+
+        finally:
+            self._out.clear()
+
+    def _write(self, obj):
+        writer = self.writers.get(type(obj))
+
+        if writer is None:
+            raise TypeError('cannot serialize {!r}'.format(
+                type(obj).__name__))
+
+        writer(self, obj)
+
+    @writers.annotate(type(None))
+    def _nil(self, obj):
+        self._out += NIL
+
+    @writers.annotate(bool)
+    def _bool(self, obj):
+        self._out += TRUE if obj else FALSE
+
+    @writers.annotate(int)
+    def _int(self, obj):
+        out = self._out
+
+        if _INT_MIN <= obj < _INT_MAX:
+            out += INT
+            # Zigzag so that small negative numbers stay short
+            out += _varint((obj << 1) ^ (obj >> 63))
+
+        else:
+            data = obj.to_bytes((obj.bit_length() + 8) // 8, 'little',
+                                signed=True)
+            out += BIGINT
+            out += _varint(len(data))
+            out += data
+
+    @writers.annotate(float)
+    def _float(self, obj):
+        self._out += FLOAT
+        self._out += _double.pack(obj)
+
+    @writers.annotate(str)
+    def _str(self, obj):
+        data = obj.encode('utf-8')
+        self._out += STR
+        self._out += _varint(len(data))
+        self._out += data
+
+    @writers.annotate(Symbol)
+    def _symbol(self, obj):
+        index = self.symbols.get(obj.name)
+
+        if index is None:
+            self.symbols[obj.name] = len(self.symbols)
+            data = obj.name.encode('utf-8')
+            self._out += SYMBOL
+            self._out += _varint(len(data))
+            self._out += data
+
+        else:
+            self._out += SYMBOL_REF
+            self._out += _varint(index)
+
+    @writers.annotate(Cons)
+    @writers.annotate(SeqView)
+    def _cons(self, obj):
+        items = []
+        cells = []
+        chain = set()
+
+        while isinstance(obj, Cons):
+            if isinstance(obj, SeqView):
+                # Views are created as the cdr is taken, their ids are
+                # reused and must not be tracked
+                items.extend(obj.values())
+                obj = None
+                continue
+
+            if id(obj) in chain or id(obj) in self._path:
+                raise ValueError('cannot serialize cyclic structure')
+
+            chain.add(id(obj))
+            cells.append(id(obj))
+            items.append(obj.car)
+            obj = obj.cdr
+
+        self._out += LIST
+        self._out += _varint(len(items))
+
+        try:
+            # A cell is an ancestor of its own car and of everything after
+            for i, item in enumerate(items):
+                if i < len(cells):
+                    self._path.add(cells[i])
+
+                self._write(item)
+
+            self._write(obj)
+
+        finally:
+            self._path.difference_update(cells)
+
+    @writers.annotate(list)
+    @writers.annotate(tuple)
+    def _vector(self, obj):
+        self._out += VECTOR
+        self._out += _varint(len(obj))
+
+        for item in obj:
+            self._write(item)
+
+
+class Reader(object):
+    """
+    Reads forms from ``bytes``, ``memoryview``, ``mmap`` or anything else
+    supporting the buffer protocol, without copying the buffer. Iterating
+    yields forms one at a time.
+    """
+
+    readers = MethodDict()
+
+    def __init__(self, buffer):
+        self.buffer = memoryview(buffer).cast('B')
+        self.symbols = []
+
+        if self.buffer[:len(MAGIC)] != MAGIC:
+            raise ValueError('not a pylisp binary stream')
+
+        self.pos = len(MAGIC)
+
+    def __iter__(self):
+        while self.pos < len(self.buffer):
+            yield self.read()
+
+    def read(self):
+        if self.pos >= len(self.buffer):
+            raise EOFError
+
+        tag = self.buffer[self.pos]
+        self.pos += 1
+        reader = self.readers.get(tag)
+
+        if reader is None:
+            raise ValueError('unknown tag {!r} at {}'.format(
+                chr(tag), self.pos - 1))
+
+        return reader(self)
+
+    def _varint(self):
+        buffer = self.buffer
+        pos = self.pos
+        shift = n = 0
+
+        while True:
+            byte = buffer[pos]
+            pos += 1
+            n |= (byte & 0x7f) << shift
+
+            if byte < 0x80:
+                self.pos = pos
+                return n
+
+            shift += 7
+
+    def _bytes(self):
+        size = self._varint()
+        start = self.pos
+        self.pos += size
+        return self.buffer[start:self.pos]
+
+    @readers.annotate(NIL[0])
+    def _nil(self):
+        return None
+
+    @readers.annotate(TRUE[0])
+    def _true(self):
+        return True
+
+    @readers.annotate(FALSE[0])
+    def _false(self):
+        return False
+
+    @readers.annotate(INT[0])
+    def _int(self):
+        n = self._varint()
+        return (n >> 1) ^ -(n & 1)
+
+    @readers.annotate(BIGINT[0])
+    def _bigint(self):
+        return int.from_bytes(self._bytes(), 'little', signed=True)
+
+    @readers.annotate(FLOAT[0])
+    def _float(self):
+        value, = _double.unpack_from(self.buffer, self.pos)
+        self.pos += _double.size
+        return value
+
+    @readers.annotate(STR[0])
+    def _str(self):
+        return str(self._bytes(), 'utf-8')
+
+    @readers.annotate(SYMBOL[0])
+    def _symbol(self):
+        symbol = Symbol(str(self._bytes(), 'utf-8'))
+        self.symbols.append(symbol)
+        return symbol
+
+    @readers.annotate(SYMBOL_REF[0])
+    def _symbol_ref(self):
+        return self.symbols[self._varint()]
+
+    @readers.annotate(LIST[0])
+    def _list(self):
+        items = [self.read() for _ in range(self._varint())]
+        tail = self.read()
+
+        for item in reversed(items):
+            tail = Cons(item, tail)
+
+        return tail
+
+    @readers.annotate(VECTOR[0])
+    def _vector(self):
+        return [self.read() for _ in range(self._varint())]
+
+
+class _Buffer(bytearray):
+
+    def write(self, data):
+        self.extend(data)
+
+
+def dumps(*forms):
+    buffer = _Buffer()
+    writer = Writer(buffer)
+
+    for form in forms:
+        writer.write(form)
+
+    return bytes(buffer)
+
+
+def loads(data):
+    """
+    Decode the first form of ``data``.
+    """
+    return Reader(data).read()
+
+
+def dump(file, *forms):
+    writer = Writer(file)
+
+    for form in forms:
+        writer.write(form)
+
+
+def load(file):
+    """
+    Iterate over the forms of a binary file, which is memory-mapped rather
+    than read.
+    """
+    return iter(Reader(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)))
@@ -1,6 +1,7 @@
 import ast
 from .parser import Parser
 from . import ir
+from . import loops
 from . import types
 from .utils import MethodDict
 
@@ -23,6 +24,172 @@ class _Compiler(object):
         raise NotImplementedError(node)
 
 
+class _LoopLowering(object):
+    """
+    Lowers named let and do loops to Python functions running a
+    ``while True`` loop over their parameters. The functions are hoisted to
+    the start of the enclosing function (or module) body, and the loop
+    expression becomes a call to them.
+
+    Subclasses provide ``_compile`` and may override ``_loop_prologue``.
+    Let and loop variables are renamed to fresh Python locals, pushed and
+    popped as scopes on top of ``scope``.
+    """
+
+    def _init_loops(self, scope=None):
+        self.nloops = 0
+        self.hoisted = [[]]
+        # Lisp names of let and loop variables to their Python locals
+        self.scopes = [] if scope is None else [scope]
+        self.nlocals = 0
+
+    def _push_locals(self, names):
+        scope = {}
+
+        for name in names:
+            scope[name] = '_l{}'.format(self.nlocals)
+            self.nlocals += 1
+
+        self.scopes.append(scope)
+        return list(scope.values())
+
+    def _pop_locals(self):
+        self.scopes.pop()
+
+    def _loop_prologue(self):
+        return []
+
+    def _loop_function(self, params, stmts, hoisted):
+        name = '_loop{}'.format(self.nloops)
+        self.nloops += 1
+        self.hoisted[-1].append(ast.FunctionDef(
+            name=name,
+            args=ast.arguments(
+                posonlyargs=[],
+                args=[ast.arg(arg=p) for p in params],
+                vararg=None,
+                kwonlyargs=[],
+                kw_defaults=[],
+                kwarg=None,
+                defaults=[]
+            ),
+            body=hoisted + [ast.While(
+                test=ast.Constant(value=True),
+                body=self._loop_prologue() + stmts,
+                orelse=[]
+            )],
+            decorator_list=[],
+            returns=None
+        ))
+        return name
+
+    def _loop_call(self, params, inits, build):
+        inits = [self._compile(init) for init in inits]
+        params = self._push_locals(params)
+        self.hoisted.append([])
+
+        try:
+            stmts = build(params)
+
+        finally:
+            hoisted = self.hoisted.pop()
+            self._pop_locals()
+
+        name = self._loop_function(params, stmts, hoisted)
+        return ast.Call(func=ast.Name(id=name, ctx=ast.Load()),
+                        args=inits, keywords=[])
+
+    @staticmethod
+    def _rebind(params, values):
+        if not params:
+            return []
+
+        return [ast.Assign(
+            targets=[ast.Tuple(
+                elts=[ast.Name(id=p, ctx=ast.Store()) for p in params],
+                ctx=ast.Store())],
+            value=ast.Tuple(elts=values, ctx=ast.Load())
+        )]
+
+    def _named_let_loop(self, name, vars_, inits, body):
+        if not loops.tail_only(name, body) or loops.captures(body):
+            raise NotImplementedError('named let {} is not a loop'.format(
+                name))
+
+        return self._loop_call(
+            vars_, inits, lambda params: self._tail(body, name, params))
+
+    def _tail(self, body, name, params):
+        stmts = [ast.Expr(value=self._compile(e)) for e in body[:-1]]
+        expr = body[-1] if body else None
+        values = loops.items(expr)
+        head = loops.name_of(values[0]) if values else None
+
+        if head == name:
+            stmts.extend(self._rebind(
+                params, [self._compile(v) for v in values[1:]]))
+            stmts.append(ast.Continue())
+
+        elif head == 'if':
+            stmts.append(ast.If(
+                test=self._compile(values[1]),
+                body=self._tail(values[2:3], name, params),
+                orelse=self._tail(values[3:4], name, params)
+            ))
+
+        elif head == 'begin' and len(values) > 1:
+            stmts.extend(self._tail(values[1:], name, params))
+
+        elif head == 'let' and not loops.is_named_let(values[1]):
+            bindings = [loops.items(b) for b in loops.items(values[1])]
+            # Bindings see the ones before them
+            targets = []
+
+            try:
+                for binding in bindings:
+                    value = self._compile(binding[1])
+                    target, = self._push_locals([loops.name_of(binding[0])])
+                    targets.append(target)
+                    stmts.append(ast.Assign(
+                        targets=[ast.Name(id=target, ctx=ast.Store())],
+                        value=value
+                    ))
+
+                stmts.extend(self._tail(values[2:], name, params))
+
+            finally:
+                for _ in targets:
+                    self._pop_locals()
+
+        elif expr is None:
+            stmts.append(ast.Return(value=ast.Constant(value=None)))
+
+        else:
+            stmts.append(ast.Return(value=self._compile(expr)))
+
+        return stmts
+
+    def _do_loop(self, vars_, inits, steps, test, results, body):
+        if loops.captures(body + [s for s in steps if s is not None] +
+                          [test]):
+            # Python closures would see the variables of the last iteration
+            raise NotImplementedError('do loop capturing its variables')
+
+        def build(params):
+            stepped = [(p, s) for p, s in zip(params, steps) if s is not None]
+            done = [ast.Expr(value=self._compile(r)) for r in results[:-1]]
+            done.append(ast.Return(value=self._compile(results[-1])
+                                   if results else ast.Constant(value=None)))
+            stmts = [ast.If(test=self._compile(test), body=done, orelse=[])]
+            stmts.extend(ast.Expr(value=self._compile(e)) for e in body)
+            stmts.extend(self._rebind(
+                [p for p, _ in stepped],
+                [self._compile(s) for _, s in stepped]))
+            return stmts
+
+        return self._loop_call(vars_, inits, build)
+
+
 class Compiler(_Compiler):
 
     compilers = MethodDict()
@@ -58,11 +225,15 @@ class Compiler(_Compiler):
         return node.value
 
 
-class PyCompiler(_Compiler):
+class PyCompiler(_Compiler, _LoopLowering):
 
     compilers = MethodDict()
     specials = MethodDict()
 
+    def __init__(self, source):
+        super().__init__(source)
+        self._init_loops()
+
     def _body(self, node):
         body = []
         for expr in node:
@@ -81,15 +252,29 @@ class PyCompiler(_Compiler):
 
     @compilers.annotate(ir.Package)
     def package(self, node):
-        return compile(ast.Module(
-            body=self._body(node),
-            lineno=node.lineno,
-            col_offset=node.col_offset
-        ), '<input>', 'exec')
+        body = self._body(node)
+        module = ast.fix_missing_locations(
+            ast.Module(body=self.hoisted[-1] + body, type_ignores=[]))
+
+        # Nodes only know where they start
+        for n in ast.walk(module):
+            if 'lineno' in n._attributes:
+                n.end_lineno = n.lineno
+                n.end_col_offset = n.col_offset
+
+        return compile(module, '<input>', 'exec')
 
     @compilers.annotate(ir.Symbol)
     def symbol(self, symbol, ctx=ast.Load):
-        return ast.Name(id=symbol.name, ctx=ctx(),
+        name = symbol.name
+
+        if ctx is ast.Load:
+            for scope in reversed(self.scopes):
+                if name in scope:
+                    name = scope[name]
+                    break
+
+        return ast.Name(id=name, ctx=ctx(),
                         lineno=symbol.lineno,
                         col_offset=symbol.col_offset)
 
@@ -108,26 +293,34 @@ class PyCompiler(_Compiler):
             func=L, args=A,
             lineno=cons.lineno,
             col_offset=cons.col_offset,
-            keywords=[],
-            kwargs=None,
-            starargs=None
+            keywords=[]
         )
 
     @compilers.annotate(ir.Number)
     def number(self, node):
-        return ast.Num(n=node.value,
-                       lineno=node.lineno,
-                       col_offset=node.col_offset)
+        return ast.Constant(value=node.value,
+                            lineno=node.lineno,
+                            col_offset=node.col_offset)
 
     @compilers.annotate(ir.Str)
     def str(self, node):
-        return ast.Str(s=node.value,
-                       lineno=node.lineno,
-                       col_offset=node.col_offset)
+        return ast.Constant(value=node.value,
+                            lineno=node.lineno,
+                            col_offset=node.col_offset)
 
     def _functiondef(self, name, args, body, lineno, col_offset):
-        args = [ast.arg(arg=c.car.name, annotation=None) for c in args]
-        body = self._body(c.car for c in body)
+        args = [ast.arg(arg=c.car.name, annotation=None) for c in args
+                if c.car is not ir.Nil]
+        # Parameters shadow let variables of enclosing scopes
+        self.scopes.append({a.arg: a.arg for a in args})
+        self.hoisted.append([])
+
+        try:
+            body = self._body(c.car for c in body)
+
+        finally:
+            hoisted = self.hoisted.pop()
+            self.scopes.pop()
 
         # Rewrite return
         body[-1] = ast.Return(
@@ -139,16 +332,15 @@ class PyCompiler(_Compiler):
         return ast.FunctionDef(
             name=name,
             args=ast.arguments(
+                posonlyargs=[],
                 args=args,
                 defaults=[],
                 kw_defaults=[],
                 kwarg=None,
-                kwargannotation=None,
                 kwonlyargs=[],
-                vararg=None,
-                varargannotation=None
+                vararg=None
             ),
-            body=body,
+            body=hoisted + body,
             returns=None,
             decorator_list=[],
             lineno=lineno,
@@ -170,7 +362,7 @@ class PyCompiler(_Compiler):
         elif isinstance(first.car, ir.Cons):
             itr = iter(first.car)
             name = next(itr).car.name
-            args = next(itr)
+            args = next(itr, ())
             body = rest
             return self._functiondef(name, args, body, lineno, col_offset)
 
@@ -182,3 +374,266 @@ class PyCompiler(_Compiler):
         args = next(rest)
         body = rest
         return self._functiondef('#<Closure>', args, body, lineno, col_offset)
+
+    @specials.annotate('if')
+    def if_(self, rest, lineno, col_offset):
+        values = [c.car for c in rest]
+        return ast.IfExp(
+            test=self._compile(values[0]),
+            body=self._compile(values[1]),
+            orelse=self._compile(values[2]) if len(values) > 2
+            else ast.Constant(value=None),
+            lineno=lineno,
+            col_offset=col_offset
+        )
+
+    @specials.annotate('let')
+    def let(self, rest, lineno, col_offset):
+        values = [c.car for c in rest]
+
+        if loops.is_named_let(values[0]):
+            return self._named_let_loop(
+                *loops.named_let(values[0], values[1], values[2:]))
+
+        # Bindings see the ones before them, as in the interpreter
+        exprs = []
+        targets = []
+
+        try:
+            for binding in map(loops.items, loops.items(values[0])):
+                value = self._compile(binding[1])
+                target, = self._push_locals([loops.name_of(binding[0])])
+                targets.append(target)
+                exprs.append(ast.NamedExpr(
+                    target=ast.Name(id=target, ctx=ast.Store()),
+                    value=value))
+
+            exprs.extend(self._compile(e) for e in values[1:])
+
+        finally:
+            for _ in targets:
+                self._pop_locals()
+
+        return ast.Subscript(
+            value=ast.Tuple(elts=exprs, ctx=ast.Load()),
+            slice=ast.Constant(value=-1),
+            ctx=ast.Load(),
+            lineno=lineno,
+            col_offset=col_offset
+        )
+
+    @specials.annotate('do')
+    def do(self, rest, lineno, col_offset):
+        values = [c.car for c in rest]
+        return self._do_loop(*loops.do(values[0], values[1], values[2:]))
+
+
+class ProcedureCompiler(_LoopLowering):
+    """
+    Compiles the body of a runtime :class:`~.types.Procedure` to a Python
+    function for tiered execution. Only forms that map directly to Python
+    expressions are supported; anything else raises
+    :class:`NotImplementedError` and the procedure stays interpreted.
+
+    Free symbols are looked up from the procedure's environment on every
+    use, so later redefinitions are seen by compiled code as well, and
+    placeholders of type ``lazy`` found there are resolved. Loops call
+    ``tick`` on every iteration, if given.
+    """
+
+    compilers = MethodDict()
+    # Keyed by the name of the interpreter method implementing the form
+    specials = MethodDict()
+
+    def __init__(self, proc, call, tick=None, lazy=None):
+        self.proc = proc
+        self.call = call
+        self.tick = tick
+        self.lazy = lazy
+        self.consts = []
+        self._init_loops({name: '_a{}'.format(i)
+                          for i, name in enumerate(proc.args)})
+
+    def _loop_prologue(self):
+        if self.tick is None:
+            return []
+
+        return [ast.Expr(value=ast.Call(
+            func=ast.Name(id='_tick', ctx=ast.Load()), args=[], keywords=[]))]
+
+    def compile(self):
+        params = list(self.scopes[0].values())
+        body = self._begin(self.proc.body)
+        fundef = ast.FunctionDef(
+            name='_tier',
+            args=ast.arguments(
+                posonlyargs=[],
+                args=[ast.arg(arg=p) for p in params],
+                vararg=None,
+                kwonlyargs=[],
+                kw_defaults=[],
+                kwarg=None,
+                defaults=[]
+            ),
+            body=self.hoisted[-1] + [ast.Return(value=body)],
+            decorator_list=[],
+            returns=None
+        )
+        module = ast.fix_missing_locations(
+            ast.Module(body=[fundef], type_ignores=[]))
+
+        namespace = {'_env': self.proc.env, '_call': self.call,
+                     '_tick': self.tick, '_lazy': self.lazy}
+        namespace.update(('_k{}'.format(i), const)
+                         for i, const in enumerate(self.consts))
+        exec(compile(module, '<tier {}>'.format(self.proc.name), 'exec'),
+             namespace)
+        return namespace['_tier']
+
+    def _compile(self, node):
+        compiler = self.compilers.get(type(node))
+
+        if compiler is None:
+            return self._const(node)
+
+        return compiler(self, node)
+
+    def _const(self, value):
+        if value is None or isinstance(value, (int, float, str)):
+            return ast.Constant(value=value)
+
+        name = '_k{}'.format(len(self.consts))
+        self.consts.append(value)
+        return ast.Name(id=name, ctx=ast.Load())
+
+    def _local(self, name):
+        for scope in reversed(self.scopes):
+            if name in scope:
+                return scope[name]
+
+        return None
+
+    @compilers.annotate(types.Symbol)
+    def symbol(self, symbol):
+        local = self._local(symbol.name)
+
+        if local is not None:
+            return ast.Name(id=local, ctx=ast.Load())
+
+        value = ast.Subscript(
+            value=ast.Name(id='_env', ctx=ast.Load()),
+            slice=ast.Constant(value=symbol.name),
+            ctx=ast.Load()
+        )
+
+        if self.lazy is None:
+            return value
+
+        # _g if type(_g := _env[name]) is not _lazy else _g.resolve()
+        return ast.IfExp(
+            test=ast.Compare(
+                left=ast.Call(
+                    func=ast.Name(id='type', ctx=ast.Load()),
+                    args=[ast.NamedExpr(
+                        target=ast.Name(id='_g', ctx=ast.Store()),
+                        value=value)],
+                    keywords=[]),
+                ops=[ast.IsNot()],
+                comparators=[ast.Name(id='_lazy', ctx=ast.Load())]),
+            body=ast.Name(id='_g', ctx=ast.Load()),
+            orelse=ast.Call(
+                func=ast.Attribute(
+                    value=ast.Name(id='_g', ctx=ast.Load()),
+                    attr='resolve', ctx=ast.Load()),
+                args=[], keywords=[])
+        )
+
+    @compilers.annotate(types.Cons)
+    def cons(self, cons):
+        values = [c.car for c in cons]
+        head = values[0]
+
+        if (isinstance(head, types.Symbol) and
+                self._local(head.name) is None):
+            fun = self.proc.env.get(head.name)
+
+            if getattr(fun, '_special', False):
+                special = self.specials.get(fun.__name__)
+
+                if special is None:
+                    raise NotImplementedError(head.name)
+
+                return special(self, *values[1:])
+
+        return ast.Call(
+            func=ast.Name(id='_call', ctx=ast.Load()),
+            args=[self._compile(v) for v in values],
+            keywords=[]
+        )
+
+    def _begin(self, exprs):
+        exprs = [self._compile(e) for e in exprs]
+
+        if not exprs:
+            return ast.Constant(value=None)
+
+        if len(exprs) == 1:
+            return exprs[0]
+
+        return ast.Subscript(
+            value=ast.Tuple(elts=exprs, ctx=ast.Load()),
+            slice=ast.Constant(value=-1),
+            ctx=ast.Load()
+        )
+
+    @specials.annotate('begin')
+    def begin(self, *exprs):
+        return self._begin(exprs)
+
+    @specials.annotate('quote')
+    def quote(self, value):
+        return self._const(value)
+
+    @specials.annotate('if_')
+    def if_(self, pred, then, else_=None):
+        return ast.IfExp(
+            test=self._compile(pred),
+            body=self._compile(then),
+            orelse=self._compile(else_)
+        )
+
+    @specials.annotate('do')
+    def do(self, specs, clause, *body):
+        return self._do_loop(*loops.do(specs, clause, body))
+
+    @specials.annotate('let')
+    def let(self, defs, *body):
+        if loops.is_named_let(defs):
+            return self._named_let_loop(
+                *loops.named_let(defs, body[0], body[1:]))
+
+        # Bindings see the ones before them, as in the interpreter
+        exprs = []
+        targets = []
+
+        try:
+            for d in loops.items(defs):
+                value = self._compile(d.cdr.car)
+                target, = self._push_locals([d.car.name])
+                targets.append(target)
+                exprs.append(ast.NamedExpr(
+                    target=ast.Name(id=target, ctx=ast.Store()),
+                    value=value
+                ))
+
+            exprs.append(self._begin(body))
+
+        finally:
+            for _ in targets:
+                self._pop_locals()
+
+        return ast.Subscript(
+            value=ast.Tuple(elts=exprs, ctx=ast.Load()),
+            slice=ast.Constant(value=-1),
+            ctx=ast.Load()
+        )
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function
+
+
+class LimitExceeded(Exception):
+    """
+    Base class for evaluation limits running out.
+    """
+
+
+class FuelExhausted(LimitExceeded):
+    pass
+
+
+class DeadlineExceeded(LimitExceeded):
+    pass
+
+
+class AllocationLimitExceeded(LimitExceeded):
+    pass
@@ -0,0 +1,457 @@
+# -*- coding: utf-8 -*-
+"""
+Differential harness running the same programs through every engine.
+
+A program leaves its answer in the global ``result``. For every program
+and engine the harness records the printed result or the name of the
+raised exception, anything written to standard output, wall time and,
+optionally, peak memory as seen by :mod:`tracemalloc`. Engines raising
+:class:`NotImplementedError` are counted as not supporting the program
+and are left out of the comparison.
+
+Programs come from a corpus of ``.spl`` files or from :func:`generate`,
+which builds random well-formed programs out of the forms every engine
+supports.
+"""
+from __future__ import absolute_import, division, print_function
+
+from argparse import ArgumentParser
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+import warnings
+
+from .aio import AsyncInterpreter
+from .compiler import Compiler, PyCompiler
+from .interpreter import Interpreter
+from .printer import to_string
+from .types import Procedure
+
+
+def _interpreter(source):
+    interpreter = Interpreter()
+    # Plain tree walking, the tiered engine covers compiled procedures
+    interpreter.tier_threshold = None
+    interpreter.eval(Compiler(source).compile())
+    return interpreter._globals.get('result')
+
+
+def _async(source):
+    interpreter = AsyncInterpreter()
+    interpreter.tier_threshold = None
+    asyncio.run(interpreter.eval_async(Compiler(source).compile()))
+    return interpreter._globals.get('result')
+
+
+def _tiered(source):
+    interpreter = Interpreter()
+    interpreter.tier_threshold = 1
+    interpreter.eval(Compiler(source).compile())
+    return interpreter._globals.get('result')
+
+
+def _pycompiler(source):
+    namespace = dict(Interpreter()._globals)
+
+    with warnings.catch_warnings():
+        # Calls of literals, as in an unsupported (quote (1 2))
+        warnings.simplefilter('ignore', SyntaxWarning)
+        code = PyCompiler(source).compile()
+
+    exec(code, namespace)
+    return namespace.get('result')
+
+
+ENGINES = {
+    'interpreter': _interpreter,
+    'async': _async,
+    'tiered': _tiered,
+    'pycompiler': _pycompiler,
+}
+
+
+def canonical(value):
+    """
+    Printed form of a result, with procedures of every engine alike.
+    """
+    if callable(value) or isinstance(value, Procedure):
+        return '#<procedure>'
+
+    return to_string(value)
+
+
+class Outcome(object):
+
+    __slots__ = ('engine', 'value', 'error', 'output', 'seconds', 'peak')
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.value = None
+        self.error = None
+        self.output = ''
+        self.seconds = 0.0
+        self.peak = None
+
+    @property
+    def supported(self):
+        return self.error != 'NotImplementedError'
+
+    def key(self):
+        return self.value, self.error, self.output
+
+    def as_dict(self):
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+
+def _measure(run, source, outcome):
+    output = io.StringIO()
+
+    with contextlib.redirect_stdout(output):
+        start = time.perf_counter()
+
+        try:
+            outcome.value = canonical(run(source))
+
+        except Exception as e:
+            outcome.error = type(e).__name__
+
+        finally:
+            outcome.seconds = time.perf_counter() - start
+
+    outcome.output = output.getvalue()
+
+
+def _peak(run, source):
+    # A separate run, tracing slows evaluation down too much to time it
+    tracing = tracemalloc.is_tracing()
+
+    if not tracing:
+        tracemalloc.start()
+
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            run(source)
+
+    except Exception:
+        pass
+
+    peak = tracemalloc.get_traced_memory()[1] - base
+
+    if not tracing:
+        tracemalloc.stop()
+
+    return peak
+
+
+class Result(object):
+
+    __slots__ = ('name', 'source', 'outcomes')
+
+    def __init__(self, name, source, outcomes):
+        self.name = name
+        self.source = source
+        self.outcomes = outcomes
+
+    def diverges(self):
+        """
+        Whether engines supporting the program disagree about it.
+        """
+        return len({o.key() for o in self.outcomes if o.supported}) > 1
+
+    def cliffs(self, reference='interpreter', factor=10.0, floor=0.001):
+        """
+        Engines over ``factor`` times slower, or using that much more
+        memory, than the reference engine. Timings under ``floor``
+        seconds are noise and ignored.
+        """
+        ref = next((o for o in self.outcomes if o.engine == reference),
+                   None)
+
+        if ref is None or not ref.supported:
+            return []
+
+        slow = []
+
+        for o in self.outcomes:
+            if o is ref or not o.supported:
+                continue
+
+            if o.seconds > floor and o.seconds > factor * max(
+                    ref.seconds, floor):
+                slow.append((o.engine, 'time'))
+
+            if o.peak and ref.peak and o.peak > factor * ref.peak:
+                slow.append((o.engine, 'memory'))
+
+        return slow
+
+
+class Report(object):
+
+    def __init__(self, results):
+        self.results = results
+
+    def divergences(self):
+        return [r for r in self.results if r.diverges()]
+
+    def cliffs(self, **kwargs):
+        return [(r, r.cliffs(**kwargs)) for r in self.results
+                if r.cliffs(**kwargs)]
+
+    def totals(self):
+        """
+        Per-engine time, peak memory and counts over all programs.
+        """
+        totals = {}
+
+        for r in self.results:
+            for o in r.outcomes:
+                t = totals.setdefault(o.engine, {
+                    'seconds': 0.0, 'peak': 0, 'errors': 0,
+                    'unsupported': 0})
+                t['seconds'] += o.seconds
+                t['peak'] = max(t['peak'], o.peak or 0)
+                t['errors'] += o.error is not None and o.supported
+                t['unsupported'] += not o.supported
+
+        return totals
+
+    def as_dict(self):
+        return {
+            'programs': len(self.results),
+            'engines': self.totals(),
+            'divergences': [
+                {'name': r.name, 'source': r.source,
+                 'outcomes': [o.as_dict() for o in r.outcomes]}
+                for r in self.divergences()],
+            'cliffs': [{'name': r.name, 'engines': cliffs}
+                       for r, cliffs in self.cliffs()],
+        }
+
+    def write(self, file):
+        print('{:<12} {:>10} {:>12} {:>7} {:>12}'.format(
+            'engine', 'seconds', 'peak bytes', 'errors', 'unsupported'),
+            file=file)
+
+        for engine, t in self.totals().items():
+            print('{:<12} {:>10.4f} {:>12} {:>7} {:>12}'.format(
+                engine, t['seconds'], t['peak'], t['errors'],
+                t['unsupported']), file=file)
+
+        for r in self.divergences():
+            print('\ndivergence in {}:'.format(r.name), file=file)
+
+            for o in r.outcomes:
+                if o.supported:
+                    print('  {:<12} {}'.format(
+                        o.engine, o.error or o.value), file=file)
+
+        for r, cliffs in self.cliffs():
+            print('\ncliff in {}: {}'.format(r.name, ', '.join(
+                '{} {}'.format(*c) for c in cliffs)), file=file)
+
+
+def run(programs, engines=None, memory=True):
+    """
+    Run ``(name, source)`` pairs through ``engines``, all of them by
+    default, and return a :class:`Report`.
+    """
+    engines = engines or ENGINES
+    results = []
+
+    for name, source in programs:
+        outcomes = []
+
+        for engine in engines:
+            outcome = Outcome(engine)
+            _measure(ENGINES[engine], source, outcome)
+
+            if memory:
+                outcome.peak = _peak(ENGINES[engine], source)
+
+            outcomes.append(outcome)
+
+        results.append(Result(name, source, outcomes))
+
+    return Report(results)
+
+
+def corpus(paths):
+    """
+    ``(name, source)`` pairs of the ``.spl`` files in ``paths``,
+    searching directories recursively.
+    """
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+
+                for name in sorted(files):
+                    if name.endswith('.spl'):
+                        yield from corpus([os.path.join(root, name)])
+
+        else:
+            with open(path) as f:
+                yield path, f.read()
+
+
+class _Generator(object):
+    """
+    Random programs over integers, made of global and function
+    definitions, ``if``, ``let`` (sometimes shadowing a name in scope),
+    named let and ``do`` loops and calls of arithmetic builtins.
+    Functions only call earlier ones, never from inside a loop, and nested
+    loops share the iteration budget of the outermost, so programs always
+    finish quickly.
+    """
+
+    operators = ('+', '-', '*')
+    comparisons = ('<', '>', '=')
+
+    def __init__(self, rng, depth, iterations):
+        self.rng = rng
+        self.depth = depth
+        self.iterations = iterations
+        self.functions = []
+        self.count = 0
+
+    def fresh(self, prefix):
+        self.count += 1
+        return '{}{}'.format(prefix, self.count)
+
+    def expr(self, scope, depth, budget):
+        rng = self.rng
+
+        if depth <= 0 or rng.random() < 0.2:
+            if scope and rng.random() < 0.6:
+                return rng.choice(scope)
+
+            return str(rng.randint(-5, 20))
+
+        depth -= 1
+        kinds = ['op', 'op', 'if', 'let']
+
+        if budget > 1:
+            kinds += ['loop', 'do']
+
+        if budget == self.iterations and self.functions:
+            kinds.append('call')
+
+        kind = rng.choice(kinds)
+
+        def sub(scope=scope):
+            return self.expr(scope, depth, budget)
+
+        if kind == 'if':
+            return '(if ({} {} {}) {} {})'.format(
+                rng.choice(self.comparisons), sub(), sub(), sub(), sub())
+
+        if kind == 'let':
+            # Sometimes shadow a variable, parameter or global
+            if scope and rng.random() < 0.3:
+                var = rng.choice(scope)
+
+            else:
+                var = self.fresh('v')
+
+            value = sub()
+            return '(let (({} {})) {})'.format(
+                var, value, sub(scope + [var] if var not in scope else scope))
+
+        if kind == 'call':
+            name, arity = rng.choice(self.functions)
+            return '({} {})'.format(
+                name, ' '.join(sub() for _ in range(arity)))
+
+        if kind == 'op':
+            return '({} {} {})'.format(
+                rng.choice(self.operators), sub(), sub())
+
+        n = rng.randint(1, budget - 1)
+        i, acc = self.fresh('i'), self.fresh('acc')
+        init = sub()
+        step = self.expr(scope + [i], depth, budget // (n + 1))
+
+        if kind == 'loop':
+            name = self.fresh('loop')
+            return ('(let {name} (({i} 0) ({acc} {init}))'
+                    ' (if (= {i} {n}) {acc}'
+                    ' ({name} (+ {i} 1) (+ {acc} {step}))))').format(
+                name=name, i=i, acc=acc, init=init, n=n, step=step)
+
+        return ('(do (({i} 0 (+ {i} 1)) ({acc} {init} (- {acc} {step})))'
+                ' ((= {i} {n}) {acc}))').format(
+            i=i, acc=acc, init=init, n=n, step=step)
+
+    def program(self, nfunctions, nglobals=2):
+        forms = []
+        globals_ = []
+
+        for _ in range(self.rng.randint(0, nglobals)):
+            name = self.fresh('g')
+            forms.append('(define {} {})'.format(
+                name, self.expr(globals_, 1, 1)))
+            globals_.append(name)
+
+        for _ in range(nfunctions):
+            name = self.fresh('f')
+            params = [self.fresh('a') for _ in range(self.rng.randint(0, 3))]
+            forms.append('(define ({}) {})'.format(
+                ' '.join([name] + params),
+                self.expr(globals_ + params, self.depth, self.iterations)))
+            self.functions.append((name, len(params)))
+
+        forms.append('(define result {})'.format(
+            self.expr(globals_, self.depth, self.iterations)))
+        return '\n'.join(forms)
+
+
+def generate(n, seed=None, depth=4, functions=3, iterations=50):
+    """
+    ``n`` random ``(name, source)`` pairs, reproducible with ``seed``.
+    """
+    rng = random.Random(seed)
+
+    for k in range(n):
+        generator = _Generator(rng, depth, iterations)
+        yield 'random-{}'.format(k), generator.program(
+            rng.randint(0, functions))
+
+
+def main():
+    argparser = ArgumentParser("Silly Python Lisp differential harness")
+    argparser.add_argument('paths', nargs='*',
+                           help=".spl files or directories")
+    argparser.add_argument('--random', type=int, default=0,
+                           help="number of random programs")
+    argparser.add_argument('--seed', type=int, default=None)
+    argparser.add_argument('--engine', action='append', choices=ENGINES,
+                           help="engine to run, all by default")
+    argparser.add_argument('--no-memory', action='store_true')
+    argparser.add_argument('--json', action='store_true')
+    args = argparser.parse_args()
+
+    programs = list(corpus(args.paths))
+    programs.extend(generate(args.random, seed=args.seed))
+    report = run(programs, args.engine, memory=not args.no_memory)
+
+    if args.json:
+        print(json.dumps(report.as_dict(), indent=2))
+
+    else:
+        report.write(sys.stdout)
+
+    return 1 if report.divergences() else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+Interpreter images: the user defined part of the global environment
+pickled to a file, so that a process can restore its library without
+re-parsing and re-evaluating the source.
+
+Builtins, the global environment itself and the interpreter are stored as
+references and resolved against the loading interpreter. Symbols are
+interned by name on load.
+"""
+from __future__ import absolute_import, division, print_function
+
+import pickle
+
+from .env import PythonBuiltins
+from . import records
+from .types import Symbol
+
+MAGIC = b'PYLISPIMG\x01'
+
+
+def _user_globals(interpreter):
+    defaults = interpreter._defaults
+
+    return {
+        name: value
+        for name, value in interpreter._globals.items()
+        if not (name in defaults and defaults[name] is value)
+    }
+
+
+class _Pickler(pickle.Pickler):
+
+    def __init__(self, file, interpreter):
+        super().__init__(file, pickle.HIGHEST_PROTOCOL)
+        self.interpreter = interpreter
+        self.builtins = {id(v): k for k, v in interpreter._defaults.items()}
+
+    def persistent_id(self, obj):
+        interpreter = self.interpreter
+
+        if isinstance(obj, Symbol):
+            return obj.name
+
+        if obj is interpreter:
+            return ('interpreter',)
+
+        if obj is interpreter._globals:
+            return ('globals',)
+
+        if isinstance(obj, PythonBuiltins):
+            return ('python',)
+
+        name = self.builtins.get(id(obj))
+
+        if name is not None and interpreter._defaults[name] is obj:
+            return ('builtin', name)
+
+        return None
+
+    def reducer_override(self, obj):
+        # Record types are created at runtime and cannot be pickled by
+        # reference, rebuild them from their definition instead
+        if (isinstance(obj, type) and issubclass(obj, records.Record) and
+                obj is not records.Record):
+            return records.record_type, (
+                obj.__name__, obj._fields,
+                [obj._fields[obj.__slots__.index(slot)]
+                 for slot in obj._init_slots])
+
+        return NotImplemented
+
+
+class _Unpickler(pickle.Unpickler):
+
+    def __init__(self, file, interpreter):
+        super().__init__(file)
+        self.interpreter = interpreter
+        self.symbols = {}
+
+    def persistent_load(self, pid):
+        if isinstance(pid, str):
+            symbol = self.symbols.get(pid)
+
+            if symbol is None:
+                symbol = self.symbols[pid] = Symbol(pid)
+
+            return symbol
+
+        kind = pid[0]
+        interpreter = self.interpreter
+
+        if kind == 'interpreter':
+            return interpreter
+
+        if kind == 'globals':
+            return interpreter._globals
+
+        if kind == 'python':
+            return interpreter._envs.maps[-1]
+
+        if kind == 'builtin':
+            return interpreter._defaults[pid[1]]
+
+        raise pickle.UnpicklingError('unknown reference {!r}'.format(pid))
+
+
+def save(interpreter, path):
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        _Pickler(f, interpreter).dump(_user_globals(interpreter))
+
+
+def load(interpreter, path):
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError('{!r} is not a pylisp image'.format(path))
+
+        interpreter._globals.update(_Unpickler(f, interpreter).load())
+
+    return interpreter
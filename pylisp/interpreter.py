@@ -1,15 +1,30 @@
 # -*- coding: utf-8 -*-
 import copy
+import io
+import sys
 
 import logging
 from functools import reduce, partial
 from contextlib import contextmanager
-from collections import ChainMap
+from collections import ChainMap, deque
 import operator
 from . import types 
+from . import lazy
+from . import image
+from . import binary
+from .sexpfile import SexpFile, read_forms
+from . import ports
+from . import printer
+from . import records
+from .modules import Loader, LazyBinding
+from . import views
+from . import loops
+from .memo import Memo
+from .compiler import ProcedureCompiler
+from .limits import Budget
 from .env import PythonBuiltins
 from .utils import MethodDict
-from .types import Procedure, Continuation
+from .types import Procedure, Continuation, Promise
 
 _log = logging.getLogger(__name__)
 
@@ -24,6 +39,12 @@ class Interpreter(object):
     _log = _log.getChild('Evaluator')
     lookup = MethodDict()
 
+    # Number of calls after which a procedure is compiled to Python,
+    # None disables tiered execution
+    tier_threshold = 1000
+    # Number of promotions kept in the promoted log
+    promoted_maxlen = 1000
+
     def __init__(self, env=None):
         # Separate env stack is required, since special methods have
         # no continuation
@@ -55,16 +76,70 @@ class Interpreter(object):
                 'car': self.car,
                 'cdr': self.cdr,
                 'let': self.let,
+                'do': self.do,
                 'cons': self.cons,
                 'begin': self.begin,
                 'call/cc': self.call_cc,
+                'delay': self.delay,
+                'force': lazy.force,
+                'cons-stream': self.cons_stream,
+                'stream-car': self.car,
+                'stream-cdr': self.stream_cdr,
+                'iter->stream': lazy.from_iterable,
+                'stream-map': self.stream_map,
+                'stream-filter': self.stream_filter,
+                'stream-take': self.stream_take,
+                'stream->list': lazy.to_list,
+                'memoize': self.memoize,
+                'define-memo': self.define_memo,
+                'memo-stats': Memo.stats,
+                'memo-clear': Memo.clear,
+                'save-image': self.save_image,
+                'dump': binary.dumps,
+                'load': binary.loads,
+                'open-sexp': SexpFile,
+                'read-file': self.read_file,
+                'sexp-ref': operator.getitem,
+                'print': self.print_,
+                'write': self.write,
+                'write-string': self.write_string,
+                'newline': self.newline,
+                'current-output-port': self.current_output_port,
+                'with-output-to-string': self.with_output_to_string,
+                'open-input-string': ports.open_input_string,
+                'open-output-string': ports.open_output_string,
+                'get-output-string': ports.get_output_string,
+                'open-input-file': ports.open_input_file,
+                'open-output-file': ports.open_output_file,
+                'close-port': ports.close_port,
+                'read-char': ports.read_char,
+                'peek-char': ports.peek_char,
+                'read-line': ports.read_line,
+                'define-record-type': self.define_record_type,
+                'require': self.require,
+                'provide': self.provide,
+                'seq->list': views.view,
+                'list->seq': views.to_python,
             },
             PythonBuiltins()
         )
+        # Global bindings and the builtins they started with, used by images
+        self._globals = self._envs.maps[0]
+        self._defaults = dict(self._globals)
         self._nil = None
         self._currcontinuation = None
+        # (name, call count) of the latest procedures promoted to Python,
+        # names only so that neither procedures nor their envs are kept
+        self.promoted = deque(maxlen=self.promoted_maxlen)
+        self._budget = None
+        # Current output port, None for whatever sys.stdout is at the time
+        self._output = None
+        self.modules = Loader(self)
 
     def eval(self, obj):
+        if self._budget is not None:
+            self._budget.step()
+
         self._log.debug('eval: %s', obj)
         evaluator = self.lookup.get(type(obj))
 
@@ -91,7 +166,12 @@ class Interpreter(object):
 
     @lookup.annotate(types.Symbol)
     def symbol(self, symbol):
-        return self._envs[symbol.name]
+        value = self._envs[symbol.name]
+
+        if type(value) is LazyBinding:
+            value = value.resolve()
+
+        return value
 
     @special
     def begin(self, *exprs):
@@ -136,13 +216,71 @@ class Interpreter(object):
         self._envs[symbol.name] = value
         self._log.debug('define: %s', self._envs)
 
+    def memoize(self, fun, maxsize=128):
+        return Memo(self._callable(fun), maxsize,
+                    name=getattr(fun, 'name', None))
+
+    @special
+    def define_memo(self, signature, *body):
+        """
+        (define-memo (name args ...) [:maxsize n] body ...)
+        """
+        maxsize = 128
+
+        if (len(body) > 2 and isinstance(body[0], types.Symbol) and
+                body[0].name == ':maxsize'):
+            maxsize = self.eval(body[1])
+            body = body[2:]
+
+        proc = self.lambda_(signature.cdr, *body)
+        proc.name = signature.car
+        self._envs[proc.name.name] = self.memoize(proc, maxsize)
+
+    @special
+    def define_record_type(self, name, constructor, predicate, *fields):
+        """
+        (define-record-type point
+          (make-point x y)
+          point?
+          (x point-x set-point-x!)
+          (y point-y))
+        """
+        specs = [[c.car for c in field] for field in fields]
+        type_ = records.record_type(
+            name.name,
+            [spec[0].name for spec in specs],
+            [c.car.name for c in constructor.cdr]
+            if isinstance(constructor.cdr, types.Cons) else []
+        )
+
+        self._envs[name.name] = type_
+        self._envs[constructor.car.name] = type_
+        self._envs[predicate.name] = records.Predicate(type_)
+
+        for spec, slot in zip(specs, type_.__slots__):
+            self._envs[spec[1].name] = records.accessor(slot)
+
+            if len(spec) > 2:
+                self._envs[spec[2].name] = records.Mutator(slot)
+
+    @special
+    def require(self, name, *names):
+        self.modules.require(name.name, self._envs, [n.name for n in names])
+
+    @special
+    def provide(self, *names):
+        # Exports are read from the module source before it is evaluated
+        pass
+
     @special
     def quote(self, value):
         return value
 
     @special
     def lambda_(self, args, *body):
-        if args is self._nil:
+        # () reads as the symbol nil
+        if args is self._nil or (isinstance(args, types.Symbol) and
+                                 args.name == 'nil'):
             args = ()
 
         else:
@@ -166,6 +304,9 @@ class Interpreter(object):
         return Continuation(env, proc.body)
 
     def list(self, *args):
+        if self._budget is not None:
+            self._budget.allocate(len(args))
+
         cons = head = types.Cons(args[0])
 
         for arg in args[1:]:
@@ -190,19 +331,151 @@ class Interpreter(object):
 
     @special
     def let(self, defs, *body):
+        if loops.is_named_let(defs):
+            return self._named_let(*loops.named_let(defs, body[0], body[1:]))
+
         env = self._envs.new_child()
 
         with self.over(env):
-            for d in defs:
-                symbol = d.car.car
-                value = d.car.cdr.car
+            for d in loops.items(defs):
+                symbol = d.car
+                value = d.cdr.car
                 env[symbol.name] = self.eval(value)
 
             return self._run_continuation(Continuation(env, body))
 
+    def _named_let(self, name, vars_, inits, body):
+        values = [self.eval(init) for init in inits]
+
+        if not loops.tail_only(name, body) or loops.captures(body):
+            # Not a loop, bind name to a procedure
+            env = self._envs.new_child()
+            env[name] = Procedure(types.Symbol(name), tuple(vars_),
+                                  tuple(body), env)
+
+            with self.over(env):
+                return self._call_procedure(env[name], *values)
+
+        # Rebind the variables of a single frame on every iteration
+        frame = dict(zip(vars_, values))
+
+        with self.over(self._envs.new_child(frame)):
+            while True:
+                # A body like (loop) never calls eval
+                if self._budget is not None:
+                    self._budget.step()
+
+                value = self._loop_body(body, name)
+
+                if type(value) is not types.Recur:
+                    return value
+
+                for var, arg in zip(vars_, value.args):
+                    frame[var] = arg
+
+    def _loop_body(self, body, name):
+        """
+        Evaluate the body of a named let loop, returning a
+        :class:`~.types.Recur` for a tail call to the loop.
+        """
+        for expr in body[:-1]:
+            self.eval(expr)
+
+        expr = body[-1]
+
+        while isinstance(expr, types.Cons):
+            values = loops.items(expr)
+            head = loops.name_of(values[0])
+
+            if head == name:
+                return types.Recur([self.eval(v) for v in values[1:]])
+
+            elif head == 'if':
+                expr = values[2] if self.eval(values[1]) else (
+                    values[3] if len(values) > 3 else None)
+
+            elif head == 'begin' and len(values) > 1:
+                for value in values[1:-1]:
+                    self.eval(value)
+
+                expr = values[-1]
+
+            elif head == 'let' and not loops.is_named_let(values[1]):
+                env = self._envs.new_child()
+
+                with self.over(env):
+                    for d in loops.items(values[1]):
+                        env[d.car.name] = self.eval(d.cdr.car)
+
+                    return self._loop_body(values[2:], name)
+
+            else:
+                break
+
+        return self.eval(expr)
+
+    @special
+    def do(self, specs, clause, *body):
+        vars_, inits, steps, test, results, body = loops.do(
+            specs, clause, body)
+        frame = dict(zip(vars_, [self.eval(init) for init in inits]))
+        steps = [(var, step) for var, step in zip(vars_, steps)
+                 if step is not None]
+        # Closures made by an iteration must keep seeing its bindings
+        fresh = loops.captures(body + [step for _, step in steps] + [test])
+        outer = self._envs
+
+        with self.over(outer.new_child(frame)):
+            while not self.eval(test):
+                for expr in body:
+                    self.eval(expr)
+
+                values = [self.eval(step) for _, step in steps]
+
+                if fresh:
+                    frame = dict(frame)
+                    self._envs = outer.new_child(frame)
+
+                for (var, _), value in zip(steps, values):
+                    frame[var] = value
+
+            value = None
+
+            for expr in results:
+                value = self.eval(expr)
+
+            return value
+
     def cons(self, car, cdr):
+        if self._budget is not None:
+            self._budget.allocate()
+
         return types.Cons(car, cdr)
 
+    @special
+    def delay(self, expr):
+        proc = Procedure(None, (), (expr,), self._envs)
+        return Promise(partial(self._call_procedure, proc))
+
+    @special
+    def cons_stream(self, car, cdr):
+        return self.cons(self.eval(car), self.delay(cdr))
+
+    def stream_cdr(self, cons):
+        return lazy.force(cons.cdr)
+
+    def stream_map(self, fun, stream):
+        return lazy.map_(self._callable(fun), stream)
+
+    def stream_filter(self, pred, stream):
+        return lazy.filter_(self._callable(pred), stream)
+
+    def stream_take(self, n, stream):
+        return lazy.take(n, stream)
+
+    def read_file(self, path):
+        return lazy.from_iterable(read_forms(path))
+
     @special
     def getattr_(self, obj, attr, *default):
         if default:
@@ -214,6 +487,71 @@ class Interpreter(object):
     def setattr_(self, obj, attr, value):
         setattr(self.eval(obj), attr.name, self.eval(value))
 
+    def current_output_port(self):
+        if self._output is None:
+            return sys.stdout
+
+        return self._output
+
+    def print_(self, *args):
+        port = self.current_output_port()
+
+        for i, arg in enumerate(args):
+            if i:
+                port.write(' ')
+
+            # Strings raw, like display, anything else in its written form
+            if isinstance(arg, str):
+                port.write(arg)
+
+            else:
+                printer.write(arg, port)
+
+        port.write('\n')
+
+    def write(self, obj, port=None):
+        printer.write(obj, port or self.current_output_port())
+
+    def write_string(self, string, port=None):
+        (port or self.current_output_port()).write(string)
+
+    def newline(self, port=None):
+        (port or self.current_output_port()).write('\n')
+
+    def with_output_to_string(self, thunk):
+        output = self._output
+        self._output = io.StringIO()
+
+        try:
+            self._callable(thunk)()
+            return self._output.getvalue()
+
+        finally:
+            self._output = output
+
+    def save_image(self, path):
+        image.save(self, path)
+
+    @classmethod
+    def load_image(cls, path):
+        return image.load(cls(), path)
+
+    @contextmanager
+    def limits(self, fuel=None, timeout=None, conses=None):
+        """
+        Limit evaluations within the block to ``fuel`` evaluation steps,
+        ``timeout`` seconds and ``conses`` cons cell allocations. Running
+        out raises a :class:`~.exceptions.LimitExceeded` subclass.
+        """
+        budget = self._budget
+        self._budget = Budget(fuel, timeout, conses)
+
+        try:
+            yield self._budget
+
+        finally:
+            self._budget = budget
+
     @contextmanager
     def over(self, env):
         _envs = self._envs
@@ -225,11 +563,34 @@ class Interpreter(object):
         finally:
             self._envs = _envs
 
+    def _callable(self, fun):
+        if type(fun) is LazyBinding:
+            fun = fun.resolve()
+
+        if isinstance(fun, Procedure):
+            return partial(self._call_procedure, fun)
+
+        return fun
+
     def _call_procedure(self, proc, *args):
         if len(proc.args) != len(args):
             raise TypeError('expected {} arguments, got {}'.format(
                 len(proc.args), len(args)))
 
+        compiled = proc.compiled
+
+        if compiled:
+            if self._budget is not None:
+                self._budget.step()
+
+            return compiled(*args)
+
+        if compiled is None and self.tier_threshold is not None:
+            proc.calls += 1
+
+            if proc.calls >= self.tier_threshold and self._tier_up(proc):
+                return proc.compiled(*args)
+
         env = self._envs.new_child(
             proc.env
         ).new_child(
@@ -239,6 +600,39 @@ class Interpreter(object):
         continuation = Continuation(env, proc.body)
         return self._run_continuation(continuation)
 
+    def _call_compiled(self, fun, *args):
+        if type(fun) is LazyBinding:
+            fun = fun.resolve()
+
+        if isinstance(fun, Procedure):
+            return self._call_procedure(fun, *args)
+
+        if isinstance(fun, Continuation) or getattr(fun, '_special', False):
+            raise TypeError('{!r} cannot be called from compiled code'.format(
+                fun))
+
+        return fun(*args)
+
+    def _compiled_tick(self):
+        # Loops in compiled code count against the budget like evaluation
+        if self._budget is not None:
+            self._budget.step()
+
+    def _tier_up(self, proc):
+        try:
+            proc.compiled = ProcedureCompiler(
+                proc, self._call_compiled, self._compiled_tick,
+                LazyBinding).compile()
+
+        except NotImplementedError as e:
+            self._log.debug('not promoting %s: unsupported %s', proc.name, e)
+            proc.compiled = False
+            return False
+
+        self._log.debug('promoted %s after %d calls', proc.name, proc.calls)
+        self.promoted.append((proc.name and proc.name.name, proc.calls))
+        return True
+
     def _run_continuation(self, continuation):
         value = continuation
 
@@ -73,15 +73,8 @@ class Cons(Node):
         super().__init__(lineno=lineno, col_offset=col_offset)
 
     def __repr__(self):
-        values = []
-
-        for value in self:
-            values.append(repr(value.car))
-
-        if value.cdr is not Nil:
-            values.extend(['.', repr(value.cdr)])
-
-        return '({})'.format(' '.join(values))
+        from .printer import to_string
+        return to_string(self)
 
     def __iter__(self):
         value = self
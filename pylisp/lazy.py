@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+Lazy streams: cons cells whose cdr is a :class:`~.types.Promise` producing
+the rest of the stream. Streams can be built over any Python iterable
+without materializing it, and consumed without holding on to the head.
+"""
+from __future__ import absolute_import, division, print_function
+
+from functools import partial
+from itertools import islice
+
+from .types import Cons, Promise
+from .views import SeqView
+
+
+def force(obj):
+    if isinstance(obj, Promise):
+        return obj.force()
+
+    return obj
+
+
+def _next_cell(iterator):
+    for value in iterator:
+        return Cons(value, Promise(partial(_next_cell, iterator)))
+
+    return None
+
+
+def from_iterable(iterable):
+    """
+    Wrap a Python iterable in a lazy stream. Only the first element is
+    pulled eagerly; the rest are pulled one at a time as cdrs are forced.
+    """
+    return _next_cell(iter(iterable))
+
+
+def iterate(obj):
+    """
+    Iterate over a stream, a proper cons list or any Python iterable.
+    """
+    obj = force(obj)
+
+    if obj is None:
+        return
+
+    if not isinstance(obj, Cons):
+        yield from obj
+        return
+
+    if isinstance(obj, SeqView):
+        yield from obj.values()
+        return
+
+    while isinstance(obj, Cons):
+        yield obj.car
+        obj = force(obj.cdr)
+
+
+def map_(fun, obj):
+    return from_iterable(map(fun, iterate(obj)))
+
+
+def filter_(pred, obj):
+    return from_iterable(filter(pred, iterate(obj)))
+
+
+def take(n, obj):
+    return from_iterable(islice(iterate(obj), n))
+
+
+def to_list(obj):
+    head = tail = None
+
+    for value in iterate(obj):
+        cell = Cons(value)
+
+        if head is None:
+            head = tail = cell
+
+        else:
+            tail.cdr = cell
+            tail = cell
+
+    return head
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function
+
+import time
+
+from .exceptions import FuelExhausted, DeadlineExceeded, \
+    AllocationLimitExceeded
+
+
+class Budget(object):
+    """
+    Resource budget of a single evaluation: evaluation steps (fuel), a
+    wall-clock deadline and a number of cons cells allocated. ``None``
+    leaves a resource unlimited.
+    """
+
+    __slots__ = ('fuel', 'deadline', 'conses', '_countdown')
+
+    # Steps between clock reads
+    interval = 256
+
+    def __init__(self, fuel=None, timeout=None, conses=None):
+        self.fuel = fuel
+        self.deadline = None if timeout is None else time.monotonic() + timeout
+        self.conses = conses
+        self._countdown = self.interval
+
+    def step(self):
+        if self.fuel is not None:
+            self.fuel -= 1
+
+            if self.fuel < 0:
+                raise FuelExhausted('evaluation ran out of fuel')
+
+        if self.deadline is not None:
+            self._countdown -= 1
+
+            if not self._countdown:
+                self._countdown = self.interval
+
+                if time.monotonic() > self.deadline:
+                    raise DeadlineExceeded('evaluation deadline exceeded')
+
+    def allocate(self, n=1):
+        if self.conses is not None:
+            self.conses -= n
+
+            if self.conses < 0:
+                raise AllocationLimitExceeded('cons allocation limit exceeded')
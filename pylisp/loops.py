@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+Shape of named ``let`` and ``do`` loops, shared by the evaluators and the
+compilers. Works on both runtime (:mod:`.types`) and parse tree
+(:mod:`.ir`) conses.
+
+    (let loop ((var init) ...) body ...)
+    (do ((var init [step]) ...) (test result ...) body ...)
+
+A named let runs as an in-place loop when its name is only ever called in
+tail position of the body, otherwise it is an ordinary local procedure.
+Bodies that may capture the loop variables (see :func:`captures`) need a
+fresh frame on every iteration, so they are not run in place either.
+"""
+from __future__ import absolute_import, division, print_function
+
+from . import ir
+from . import types
+
+_CONS = (types.Cons, ir.Cons)
+_SYMBOL = (types.Symbol, ir.Symbol)
+_CAPTURING = frozenset(('lambda', 'delay', 'cons-stream', 'define'))
+
+
+def name_of(obj):
+    """
+    Name of a symbol, None for anything else.
+    """
+    if isinstance(obj, _SYMBOL):
+        return obj.name
+
+    return None
+
+
+def items(obj):
+    """
+    Elements of a list, nil (of any flavour) being the empty list.
+    """
+    if isinstance(obj, _CONS):
+        return [c.car for c in obj]
+
+    return []
+
+
+def is_named_let(defs):
+    name = name_of(defs)
+    return name is not None and name != 'nil'
+
+
+def named_let(name, bindings, body):
+    """
+    Return ``(name, vars, inits, body)``.
+    """
+    pairs = [items(b) for b in items(bindings)]
+    return (name_of(name), [name_of(p[0]) for p in pairs],
+            [p[1] for p in pairs], list(body))
+
+
+def do(specs, clause, body):
+    """
+    Return ``(vars, inits, steps, test, results, body)``, steps holding
+    None for variables without one.
+    """
+    specs = [items(s) for s in items(specs)]
+    clause = items(clause)
+    return ([name_of(s[0]) for s in specs],
+            [s[1] for s in specs],
+            [s[2] if len(s) > 2 else None for s in specs],
+            clause[0], clause[1:], list(body))
+
+
+def tail_only(name, body):
+    """
+    Whether every occurrence of ``name`` in ``body`` is a call in tail
+    position, so that the named let can run as a loop.
+    """
+    stack = [(expr, False) for expr in body[:-1]]
+
+    if body:
+        stack.append((body[-1], True))
+
+    while stack:
+        expr, tail = stack.pop()
+
+        if name_of(expr) == name:
+            return False
+
+        values = items(expr)
+
+        if not values:
+            continue
+
+        head = name_of(values[0])
+        args = values[1:]
+
+        if head == name:
+            if not tail:
+                return False
+
+            stack.extend((arg, False) for arg in args)
+
+        elif head == 'quote':
+            continue
+
+        elif head == 'if':
+            stack.extend((arg, tail and i > 0) for i, arg in enumerate(args))
+
+        elif head == 'begin':
+            stack.extend((arg, tail and i == len(args) - 1)
+                         for i, arg in enumerate(args))
+
+        elif head == 'let' and args and not is_named_let(args[0]):
+            bound = [items(b) for b in items(args[0])]
+
+            if any(name_of(b[0]) == name for b in bound):
+                return False
+
+            stack.extend((b[1], False) for b in bound if len(b) > 1)
+            stack.extend((arg, tail and i == len(args) - 2)
+                         for i, arg in enumerate(args[1:]))
+
+        else:
+            # Anything else, including nested loops and lambdas, is not a
+            # tail context
+            stack.extend((value, False) for value in values)
+
+    return True
+
+
+def captures(exprs):
+    """
+    Whether any of ``exprs`` may close over or define into the frame it is
+    evaluated in.
+    """
+    stack = list(exprs)
+
+    while stack:
+        values = items(stack.pop())
+
+        if not values:
+            continue
+
+        head = name_of(values[0])
+
+        if head in _CAPTURING:
+            return True
+
+        if head != 'quote':
+            stack.extend(values)
+
+    return False
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+Memoization of pylisp procedures with bounded LRU eviction.
+"""
+from __future__ import absolute_import, division, print_function
+
+from collections import OrderedDict
+from numbers import Number
+
+from .types import Cons, Symbol
+from .views import SeqView
+
+
+class Unhashable(TypeError):
+    pass
+
+
+def key(value, _path=None):
+    """
+    Build a hashable cache key for a value. Numbers, strings and symbols
+    are keyed by value, cons lists structurally. Anything else, cyclic
+    lists included, raises :class:`Unhashable`. Lists nested deeper than
+    the recursion limit raise :class:`RecursionError`.
+    """
+    if value is None or isinstance(value, (Number, str)):
+        # Tag with type so that 1, 1.0 and True do not collide
+        return type(value), value
+
+    if isinstance(value, Symbol):
+        return Symbol, value.name
+
+    if isinstance(value, Cons):
+        # Cells leading to the current one, shared structure elsewhere is
+        # fine
+        if _path is None:
+            _path = set()
+
+        items = []
+        cells = []
+
+        try:
+            while isinstance(value, Cons):
+                if isinstance(value, SeqView):
+                    # Keyed like the equivalent cons list, without tracking
+                    # the transient cells of the view
+                    items.extend(key(v, _path) for v in value.values())
+                    value = None
+                    continue
+
+                if id(value) in _path:
+                    raise Unhashable('cyclic structure')
+
+                _path.add(id(value))
+                cells.append(id(value))
+                items.append(key(value.car, _path))
+                value = value.cdr
+
+            return Cons, tuple(items), key(value, _path)
+
+        finally:
+            _path.difference_update(cells)
+
+    raise Unhashable(type(value).__name__)
+
+
+class Memo(object):
+    """
+    Callable wrapper caching results of ``fun`` by its arguments. At most
+    ``maxsize`` results are kept, least recently used are evicted first.
+    A ``maxsize`` of ``None`` means unbounded.
+    """
+
+    __slots__ = ('fun', 'name', 'maxsize', 'cache',
+                 'hits', 'misses', 'evictions')
+
+    def __init__(self, fun, maxsize=128, name=None):
+        self.fun = fun
+        self.name = name
+        self.maxsize = maxsize
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __call__(self, *args):
+        try:
+            k = tuple(key(arg) for arg in args)
+
+        except (Unhashable, RecursionError):
+            # Too deeply nested to key, not worth caching either
+            return self.fun(*args)
+
+        cache = self.cache
+
+        try:
+            value = cache[k]
+
+        except KeyError:
+            pass
+
+        else:
+            self.hits += 1
+            cache.move_to_end(k)
+            return value
+
+        self.misses += 1
+        value = self.fun(*args)
+        cache[k] = value
+
+        if self.maxsize is not None and len(cache) > self.maxsize:
+            cache.popitem(last=False)
+            self.evictions += 1
+
+        return value
+
+    def clear(self):
+        self.cache.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self.cache),
+            'maxsize': self.maxsize,
+        }
+
+    def __repr__(self):
+        return '#<Memo {}>'.format(self.name or self.fun)
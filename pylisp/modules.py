@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+"""
+Modules. ``(require name)`` finds ``name.spl`` on the search path and
+binds every name the module lists in ``(provide ...)`` as ``name.export``;
+names given after the module name are bound unqualified as well.
+
+Modules are loaded at most once per interpreter and lazily: requiring a
+module only reads its forms, the body is evaluated on the first reference
+to one of its exports. Compiled forms of each module are cached in
+``__splcache__`` next to the source in the binary format.
+"""
+from __future__ import absolute_import, division, print_function
+
+from collections import ChainMap
+import logging
+import os
+import struct
+
+from . import binary
+from . import types
+from .compiler import Compiler
+
+_log = logging.getLogger(__name__)
+
+SUFFIX = '.spl'
+CACHE_DIR = '__splcache__'
+CACHE_SUFFIX = '.splc'
+CACHE_MAGIC = b'PLMOD\x01'
+
+_header = struct.Struct('<QQ')
+
+UNLOADED, LOADING, LOADED = range(3)
+
+
+class LazyBinding(object):
+    """
+    Placeholder bound for an export until its module has been loaded.
+    """
+
+    __slots__ = ('module', 'name')
+
+    def __init__(self, module, name):
+        self.module = module
+        self.name = name
+
+    def resolve(self):
+        return self.module.get(self.name)
+
+    def __call__(self, *args):
+        # Python callers do not go through symbol lookup
+        interpreter = self.module.loader.interpreter
+        return interpreter._callable(self.resolve())(*args)
+
+    def __repr__(self):
+        return '#<LazyBinding {}.{}>'.format(self.module.name, self.name)
+
+
+class Module(object):
+
+    __slots__ = ('loader', 'name', 'path', 'forms', 'exports',
+                 'namespace', 'state', 'sites')
+
+    def __init__(self, loader, name, path, forms):
+        self.loader = loader
+        self.name = name
+        self.path = path
+        self.forms = forms
+        self.exports = _exports(forms)
+        self.namespace = {}
+        self.state = UNLOADED
+        # (mapping, key, export) of every lazy binding made for the module
+        self.sites = []
+
+    def get(self, name):
+        if self.state == UNLOADED:
+            self.loader.load(self)
+
+        try:
+            return self.namespace[name]
+
+        except KeyError:
+            raise NameError("module '{}' does not define '{}'".format(
+                self.name, name))
+
+    def bind(self, mapping, key, name):
+        if name not in self.exports:
+            raise NameError("module '{}' does not export '{}'".format(
+                self.name, name))
+
+        if self.state == LOADED:
+            mapping[key] = self.namespace[name]
+
+        else:
+            mapping[key] = LazyBinding(self, name)
+            self.sites.append((mapping, key, name))
+
+    def __repr__(self):
+        return '#<Module {}>'.format(self.name)
+
+
+def _exports(forms):
+    exports = []
+
+    for form in forms:
+        if (isinstance(form, types.Cons) and
+                isinstance(form.car, types.Symbol) and
+                form.car.name == 'provide' and
+                isinstance(form.cdr, types.Cons)):
+            exports.extend(c.car.name for c in form.cdr)
+
+    return exports
+
+
+def _default_path():
+    path = os.environ.get('PYLISPPATH')
+    return (path.split(os.pathsep) if path else []) + [os.getcwd()]
+
+
+class Loader(object):
+
+    def __init__(self, interpreter, path=None):
+        self.interpreter = interpreter
+        self.path = _default_path() if path is None else list(path)
+        self.modules = {}
+
+    def find(self, name):
+        relative = name.replace('.', os.sep) + SUFFIX
+
+        for directory in self.path:
+            filename = os.path.join(directory, relative)
+
+            if os.path.isfile(filename):
+                return filename
+
+        raise ImportError("no module named '{}'".format(name))
+
+    def module(self, name):
+        module = self.modules.get(name)
+
+        if module is None:
+            path = self.find(name)
+            module = self.modules[name] = Module(
+                self, name, path, self.forms(path))
+
+        return module
+
+    def require(self, name, mapping, names=()):
+        module = self.module(name)
+
+        for export in module.exports:
+            module.bind(mapping, '{}.{}'.format(name, export), export)
+
+        for export in names:
+            module.bind(mapping, export, export)
+
+        return module
+
+    def load(self, module):
+        _log.debug('loading module %s', module.name)
+        interpreter = self.interpreter
+        module.state = LOADING
+        env = ChainMap(module.namespace, interpreter._globals,
+                       interpreter._envs.maps[-1])
+
+        try:
+            with interpreter.over(env):
+                for form in module.forms:
+                    interpreter.eval(form)
+
+        except BaseException:
+            module.state = UNLOADED
+            module.namespace.clear()
+            raise
+
+        module.state = LOADED
+
+        for mapping, key, name in module.sites:
+            if isinstance(mapping.get(key), LazyBinding):
+                mapping[key] = module.namespace.get(name)
+
+        del module.sites[:]
+
+    @staticmethod
+    def cache_path(path):
+        directory, filename = os.path.split(path)
+        return os.path.join(directory, CACHE_DIR,
+                            os.path.splitext(filename)[0] + CACHE_SUFFIX)
+
+    def forms(self, path):
+        """
+        Top-level compiled forms of the module at ``path``, from the cache
+        when it is up to date.
+        """
+        stat = os.stat(path)
+        stamp = (stat.st_size, stat.st_mtime_ns)
+        cache = self.cache_path(path)
+
+        try:
+            with open(cache, 'rb') as f:
+                data = f.read()
+
+        except OSError:
+            data = b''
+
+        start = len(CACHE_MAGIC) + _header.size
+
+        if (len(data) >= start and data[:len(CACHE_MAGIC)] == CACHE_MAGIC and
+                _header.unpack_from(data, len(CACHE_MAGIC)) == stamp):
+            try:
+                return list(binary.Reader(memoryview(data)[start:]))
+
+            except Exception:
+                # A damaged cache is recompiled like a stale one
+                _log.debug('ignoring bad cache %s', cache, exc_info=True)
+
+        with open(path) as f:
+            # Compiler wraps the forms in (begin ...)
+            begin = Compiler(f).compile()
+
+        forms = [c.car for c in begin.cdr] if begin.cdr else []
+        self._write_cache(cache, stamp, forms)
+        return forms
+
+    @staticmethod
+    def _write_cache(cache, stamp, forms):
+        tmp = '{}.{}.tmp'.format(cache, os.getpid())
+
+        try:
+            os.makedirs(os.path.dirname(cache), exist_ok=True)
+
+            with open(tmp, 'wb') as f:
+                f.write(CACHE_MAGIC)
+                f.write(_header.pack(*stamp))
+                f.write(binary.dumps(*forms))
+
+            os.replace(tmp, cache)
+
+        except (OSError, TypeError):
+            _log.debug('could not write module cache %s', cache,
+                       exc_info=True)
@@ -2,6 +2,7 @@
 from __future__ import absolute_import, division, print_function
 
 import logging
+import re
 from .utils import MethodDict
 from .tokenizer import Tokenizer, LPAR, RPAR, STRING, SYMBOL, QUOTE, COMMENT
 from . import ir
@@ -67,7 +68,9 @@ class Parser(object):
 
     @parsers.annotate(STRING)
     def create_str(self, token):
-        s = ir.Str(token.value, lineno=token.lineno,
+        # Backslash escapes itself and double quote, anything else is kept
+        value = re.sub(r'\\([\\"])', r'\1', token.value)
+        s = ir.Str(value, lineno=token.lineno,
                    col_offset=token.linepos)
         self.ir[-1].append(s)
         self._pop_quote()
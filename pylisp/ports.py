@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+Input and output ports. String ports are :class:`io.StringIO` objects and
+file ports are buffered text files, so any Python text stream can be used
+as a port. Peeking at a port that cannot seek, like a terminal or a pipe,
+keeps the character aside for the next read.
+"""
+from __future__ import absolute_import, division, print_function
+
+import io
+import sys
+import weakref
+
+# Characters peeked from ports that cannot seek back
+_peeked = weakref.WeakKeyDictionary()
+
+
+def open_input_string(string):
+    return io.StringIO(string)
+
+
+def open_output_string():
+    return io.StringIO()
+
+
+def get_output_string(port):
+    return port.getvalue()
+
+
+def open_input_file(path):
+    return open(path, 'r')
+
+
+def open_output_file(path):
+    return open(path, 'w')
+
+
+def close_port(port):
+    port.close()
+
+
+def read_char(port=None):
+    """
+    Read a single character, or return nil at end of input.
+    """
+    port = port or sys.stdin
+    char = _peeked.pop(port, None)
+
+    if char is None:
+        char = port.read(1)
+
+    return char or None
+
+
+def peek_char(port=None):
+    port = port or sys.stdin
+
+    if port in _peeked:
+        return _peeked[port] or None
+
+    if port.seekable():
+        position = port.tell()
+        char = port.read(1)
+        port.seek(position)
+
+    else:
+        char = _peeked[port] = port.read(1)
+
+    return char or None
+
+
+def read_line(port=None):
+    port = port or sys.stdin
+    line = _peeked.pop(port, None)
+
+    if line is None:
+        line = port.readline()
+
+    elif line not in ('', '\n'):
+        line += port.readline()
+
+    if not line:
+        return None
+
+    return line.rstrip('\n')
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+Iterative printer for runtime and parse tree values.
+
+Structures are walked with an explicit stack, so nesting depth is not
+limited by Python's recursion limit, and output is written to a file-like
+object in chunks. Shared and cyclic conses are printed with datum labels,
+``#0=(a . #0#)``.
+"""
+from __future__ import absolute_import, division, print_function
+
+import io
+
+from . import ir
+from . import types
+from .views import SeqView
+
+_CONS = (types.Cons, ir.Cons)
+_SYMBOL = (types.Symbol, ir.Symbol)
+
+# Number of output parts buffered before writing them out
+CHUNK = 1024
+
+
+class _Raw(str):
+    """
+    Literal output, as opposed to a string value to be printed.
+    """
+
+
+class _Rest(object):
+    """
+    Marks the remainder of a list following ``cell``.
+    """
+
+    __slots__ = ('cell',)
+
+    def __init__(self, cell):
+        self.cell = cell
+
+
+_OPEN = _Raw('(')
+_CLOSE = _Raw(')')
+_SPACE = _Raw(' ')
+_DOT = _Raw(' . ')
+
+
+def _is_nil(value):
+    return (value is None or value is ir.Nil or
+            isinstance(value, types.Symbol) and value.name == 'nil')
+
+
+def shared(obj):
+    """
+    Return ids of conses reachable more than once from ``obj``.
+    """
+    seen = set()
+    labels = set()
+    stack = [obj]
+
+    while stack:
+        value = stack.pop()
+
+        if not isinstance(value, _CONS):
+            continue
+
+        if isinstance(value, SeqView):
+            # View cells are transient and never shared, only their
+            # elements can be
+            stack.extend(value.values())
+            continue
+
+        if id(value) in seen:
+            labels.add(id(value))
+            continue
+
+        seen.add(id(value))
+        stack.append(value.cdr)
+        stack.append(value.car)
+
+    return labels
+
+
+def _string(value):
+    return '"{}"'.format(value.replace('\\', '\\\\').replace('"', '\\"'))
+
+
+def atom(value):
+    if value is None:
+        return 'nil'
+
+    if isinstance(value, _SYMBOL):
+        return value.name
+
+    if isinstance(value, str):
+        return _string(value)
+
+    if isinstance(value, ir.Str):
+        return _string(value.value)
+
+    if isinstance(value, ir.Number):
+        return repr(value.value)
+
+    return repr(value)
+
+
+def write(obj, file, labels=True):
+    """
+    Write ``obj`` to ``file``. With ``labels`` false shared structure is
+    printed as many times as it is reachable, which saves finding it first
+    but never terminates for cyclic structure.
+    """
+    labelled = shared(obj) if labels else ()
+    numbers = {}
+    parts = []
+    stack = [obj]
+
+    while stack:
+        value = stack.pop()
+
+        if isinstance(value, _Raw):
+            parts.append(value)
+
+        elif isinstance(value, _Rest):
+            tail = value.cell.cdr
+
+            if _is_nil(tail):
+                parts.append(_CLOSE)
+
+            elif isinstance(tail, _CONS) and id(tail) not in labelled:
+                parts.append(_SPACE)
+                stack.append(_Rest(tail))
+                stack.append(tail.car)
+
+            else:
+                parts.append(_DOT)
+                stack.append(_CLOSE)
+                stack.append(tail)
+
+        elif isinstance(value, _CONS):
+            if id(value) in labelled:
+                number = numbers.get(id(value))
+
+                if number is not None:
+                    parts.append('#{}#'.format(number))
+                    continue
+
+                number = numbers[id(value)] = len(numbers)
+                parts.append('#{}='.format(number))
+
+            parts.append(_OPEN)
+            stack.append(_Rest(value))
+            stack.append(value.car)
+
+        else:
+            parts.append(atom(value))
+
+        if len(parts) >= CHUNK:
+            file.write(''.join(parts))
+            parts.clear()
+
+    file.write(''.join(parts))
+
+
+def to_string(obj, labels=True):
+    out = io.StringIO()
+    write(obj, out, labels)
+    return out.getvalue()
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+Record types. Every ``define-record-type`` creates a Python class with
+``__slots__``, and its constructor, predicate, accessors and mutators are
+plain Python callables, so the evaluator calls them like any builtin.
+"""
+from __future__ import absolute_import, division, print_function
+
+from operator import attrgetter
+import re
+
+
+def _slot(name):
+    slot = re.sub(r'\W', '_', name)
+
+    if not slot.isidentifier():
+        slot = '_' + slot
+
+    return slot
+
+
+class Record(object):
+
+    __slots__ = ()
+
+    # Field names and the slots of the constructor arguments
+    _fields = ()
+    _init_slots = ()
+
+    def __init__(self, *args):
+        if len(args) != len(self._init_slots):
+            raise TypeError('expected {} arguments, got {}'.format(
+                len(self._init_slots), len(args)))
+
+        for slot, value in zip(self._init_slots, args):
+            setattr(self, slot, value)
+
+    def __repr__(self):
+        values = ' '.join(
+            '{}={!r}'.format(field, getattr(self, slot, None))
+            for field, slot in zip(self._fields, self.__slots__))
+        return '#<{} {}>'.format(type(self).__name__, values)
+
+
+def record_type(name, fields, init_fields):
+    """
+    Create a record class named ``name`` with ``fields``, whose
+    constructor takes ``init_fields`` in order.
+    """
+    slots = tuple(_slot(field) for field in fields)
+
+    if len(set(slots)) != len(slots):
+        raise ValueError('duplicate fields in {}'.format(name))
+
+    lookup = dict(zip(fields, slots))
+
+    try:
+        init_slots = tuple(lookup[field] for field in init_fields)
+
+    except KeyError as e:
+        raise ValueError('unknown field {} in constructor'.format(e))
+
+    return type(name, (Record,), {
+        '__slots__': slots,
+        '_fields': tuple(fields),
+        '_init_slots': init_slots,
+    })
+
+
+class Predicate(object):
+
+    __slots__ = ('type',)
+
+    def __init__(self, type_):
+        self.type = type_
+
+    def __call__(self, obj):
+        return isinstance(obj, self.type)
+
+
+class Mutator(object):
+
+    __slots__ = ('slot',)
+
+    def __init__(self, slot):
+        self.slot = slot
+
+    def __call__(self, obj, value):
+        setattr(obj, self.slot, value)
+
+
+def accessor(slot):
+    return attrgetter(slot)
@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+"""
+Incremental re-evaluation of a source file in a persistent interpreter.
+
+Top-level forms are matched against the previous version of the source by
+their printed text. Changed forms are evaluated, and so are unchanged forms
+referring to any name defined or assigned by a changed or removed form,
+transitively in source order. Everything else is skipped.
+"""
+from __future__ import absolute_import, division, print_function
+
+import logging
+import time
+
+from . import types
+from .compiler import Compiler
+from .printer import to_string
+
+_log = logging.getLogger(__name__)
+
+
+def definitions(code):
+    """
+    Names bound by a top-level form.
+    """
+    if not (isinstance(code, types.Cons) and
+            isinstance(code.car, types.Symbol)):
+        return set()
+
+    head = code.car.name
+    args = [c.car for c in code.cdr] if isinstance(code.cdr, types.Cons) \
+        else []
+
+    if head in ('define', 'define-memo') and args:
+        target = args[0]
+
+        if isinstance(target, types.Cons):
+            target = target.car
+
+        if isinstance(target, types.Symbol):
+            return {target.name}
+
+    elif head == 'define-record-type' and len(args) >= 3:
+        names = {args[0].name, args[1].car.name, args[2].name}
+
+        for field in args[3:]:
+            names.update(c.car.name for c in list(field)[1:])
+
+        return names
+
+    return set()
+
+
+def assignments(code):
+    """
+    Names a top-level ``set!``, ``set-car!`` or ``set-cdr!`` writes to.
+    """
+    if not (isinstance(code, types.Cons) and
+            isinstance(code.car, types.Symbol) and
+            code.car.name in ('set!', 'set-car!', 'set-cdr!') and
+            isinstance(code.cdr, types.Cons) and
+            isinstance(code.cdr.car, types.Symbol)):
+        return set()
+
+    return {code.cdr.car.name}
+
+
+def references(code):
+    """
+    Every symbol name appearing in a form.
+    """
+    names = set()
+    stack = [code]
+
+    while stack:
+        value = stack.pop()
+
+        if isinstance(value, types.Symbol):
+            names.add(value.name)
+
+        elif isinstance(value, types.Cons):
+            stack.append(value.car)
+            stack.append(value.cdr)
+
+    return names
+
+
+class Form(object):
+
+    __slots__ = ('key', 'code', 'binds', 'defines', 'refs', 'elapsed', 'ok')
+
+    def __init__(self, code):
+        self.key = to_string(code)
+        self.code = code
+        self.binds = definitions(code)
+        # Forms reading an assigned name depend on the assignment, which
+        # itself depends on the binding it changes
+        self.defines = self.binds | assignments(code)
+        self.refs = references(code) - self.binds
+        self.elapsed = 0.0
+        self.ok = False
+
+
+class Reloader(object):
+
+    def __init__(self, interpreter):
+        self.interpreter = interpreter
+        self.forms = []
+
+    def update(self, source):
+        """
+        Bring the interpreter up to date with ``source`` and return
+        statistics of the reload.
+        """
+        begin = Compiler(source).compile()
+        codes = [c.car for c in begin.cdr] if begin.cdr else []
+
+        previous = {}
+
+        for form in self.forms:
+            if form.ok:
+                previous.setdefault(form.key, []).append(form)
+
+        forms = []
+        changed = set()
+
+        for code in codes:
+            form = Form(code)
+            matches = previous.get(form.key)
+
+            if matches:
+                form = matches.pop(0)
+
+            else:
+                changed.add(id(form))
+
+            forms.append(form)
+
+        dirty = set()
+        defined = set()
+
+        for form in forms:
+            defined |= form.binds
+
+            if id(form) in changed:
+                dirty |= form.defines
+
+        for removed in previous.values():
+            for form in removed:
+                dirty |= form.defines
+
+                for name in form.binds - defined:
+                    self.interpreter._globals.pop(name, None)
+
+        evaluated = 0
+        saved = 0.0
+        start = time.perf_counter()
+
+        for form in forms:
+            if id(form) not in changed and not (form.refs & dirty):
+                saved += form.elapsed
+                continue
+
+            evaluated += 1
+            dirty |= form.defines
+            form_start = time.perf_counter()
+
+            try:
+                self.interpreter.eval(form.code)
+                form.ok = True
+
+            except Exception:
+                _log.exception('Evaluation error')
+                form.ok = False
+
+            form.elapsed = time.perf_counter() - form_start
+
+        self.forms = forms
+
+        return {
+            'forms': len(forms),
+            'evaluated': evaluated,
+            'elapsed': time.perf_counter() - start,
+            'saved': saved,
+        }
+
+
+def watch(interpreter, path, interval=0.5, out=None):
+    """
+    Evaluate the file at ``path`` and re-evaluate it incrementally whenever
+    its modification time changes.
+    """
+    import os
+    import sys
+
+    out = out or sys.stderr
+    reloader = Reloader(interpreter)
+    mtime = None
+
+    while True:
+        try:
+            current = os.stat(path).st_mtime_ns
+
+        except OSError:
+            current = None
+
+        if current is not None and current != mtime:
+            mtime = current
+
+            try:
+                with open(path) as f:
+                    stats = reloader.update(f.read())
+
+            except SyntaxError:
+                _log.exception('Compiler error')
+
+            else:
+                out.write('reloaded {}: evaluated {}/{} forms in {:.3f}s, '
+                          'saved ~{:.3f}s\n'.format(
+                              path, stats['evaluated'], stats['forms'],
+                              stats['elapsed'], stats['saved']))
+                out.flush()
+
+        time.sleep(interval)
@@ -7,6 +7,8 @@ import os
 import logging
 from .interpreter import Interpreter
 from .compiler import Compiler
+from . import printer
+from .reload import watch
 
 
 def repl():
@@ -14,6 +16,9 @@ def repl():
     argparser.add_argument(
         '-d', '--debug', action='store_true',
         help="debug output")
+    argparser.add_argument(
+        '-w', '--watch', action='store_true',
+        help="re-evaluate changed forms of file whenever it is saved")
     argparser.add_argument(
         'file', type=FileType('r'), nargs='?',
         help="program read from file")
@@ -26,8 +31,17 @@ def repl():
 
     log = logging.getLogger(__name__)
 
+    if args.file and args.watch:
+        args.file.close()
+
+        try:
+            watch(e, args.file.name)
+
+        except KeyboardInterrupt:
+            return
+
     if args.file:
-        sys.exit(e.eval(Parser(args.file).parse()))
+        sys.exit(e.eval(Compiler(args.file).compile()))
 
     try:
         import readline
@@ -74,7 +88,8 @@ def repl():
             continue
 
         try:
-            print(e.eval(code))
+            printer.write(e.eval(code), sys.stdout)
+            sys.stdout.write('\n')
 
         except Exception:
             log.exception('Evaluation error')
@@ -0,0 +1,306 @@
+# -*- coding: utf-8 -*-
+"""
+Local evaluation server keeping a pool of warm interpreters.
+
+The protocol is newline delimited JSON over a Unix socket or localhost
+TCP. A request is either ``{"source": "..."}`` or
+``{"call": "name", "args": [...]}`` and is answered with
+``{"ok": true, "value": ...}`` or ``{"ok": false, "error": "..."}``.
+
+Global bindings of an interpreter are restored after every request, so
+``define`` and ``set!`` do not leak between requests, and the caches of
+memoized procedures bound globally are cleared. Mutation of shared data
+structures (``set-car!`` and friends) and forced promises are not undone.
+"""
+from __future__ import absolute_import, division, print_function
+
+from argparse import ArgumentParser
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import json
+import logging
+import socket
+import time
+
+from .compiler import Compiler
+from .interpreter import Interpreter
+from .memo import Memo
+from . import lazy
+from . import types
+
+_log = logging.getLogger(__name__)
+
+
+def encode(value):
+    """
+    Convert an evaluation result to something JSON serializable.
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+
+    if isinstance(value, types.Symbol):
+        return value.name
+
+    if isinstance(value, types.Cons):
+        return [encode(v) for v in lazy.iterate(value)]
+
+    return repr(value)
+
+
+def decode(value):
+    if isinstance(value, list):
+        return lazy.to_list(decode(v) for v in value)
+
+    return value
+
+
+class Pool(object):
+    """
+    Fixed size pool of interpreters warmed up with library source or an
+    image. Evaluation runs in worker threads, one per interpreter.
+    """
+
+    def __init__(self, size=4, source=None, image=None, timeout=None):
+        self.size = size
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(size)
+        self._idle = asyncio.Queue()
+
+        for _ in range(size):
+            interpreter = self._warm(source, image)
+            snapshot = dict(interpreter._globals)
+            self._idle.put_nowait((interpreter, snapshot))
+
+    @staticmethod
+    def _warm(source, image):
+        if image is not None:
+            return Interpreter.load_image(image)
+
+        interpreter = Interpreter()
+
+        if source is not None:
+            interpreter.eval(Compiler(source).compile())
+
+        return interpreter
+
+    @staticmethod
+    def _run(interpreter, snapshot, request, timeout):
+        try:
+            # The deadline stops runaway code so that the interpreter is
+            # freed soon after the request has timed out
+            with interpreter.limits(timeout=timeout):
+                if 'call' in request:
+                    fun = interpreter._callable(
+                        interpreter._globals[request['call']])
+                    args = [decode(arg) for arg in request.get('args', ())]
+                    value = fun(*args)
+
+                else:
+                    value = interpreter.eval(
+                        Compiler(request['source']).compile())
+
+            return encode(value)
+
+        finally:
+            interpreter._globals.clear()
+            interpreter._globals.update(snapshot)
+
+            # Cached results may depend on globals the request changed
+            for value in snapshot.values():
+                if isinstance(value, Memo):
+                    value.clear()
+
+    async def submit(self, request):
+        loop = asyncio.get_running_loop()
+        timeout = request.get('timeout')
+
+        if timeout is None:
+            timeout = self.timeout
+
+        interpreter, snapshot = await self._idle.get()
+        future = loop.run_in_executor(
+            self._executor, self._run, interpreter, snapshot, request,
+            timeout)
+        # Hand the interpreter back only once it is really done, even if the
+        # request has timed out already
+        future.add_done_callback(
+            lambda _: self._idle.put_nowait((interpreter, snapshot)))
+
+        return await asyncio.wait_for(asyncio.shield(future), timeout)
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+
+class Server(object):
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+
+                if not line:
+                    break
+
+                response = await self.respond(line)
+                writer.write(json.dumps(response).encode() + b'\n')
+                await writer.drain()
+
+        finally:
+            writer.close()
+
+    async def respond(self, line):
+        try:
+            value = await self.pool.submit(json.loads(line))
+
+        except asyncio.TimeoutError:
+            return {'ok': False, 'error': 'timeout'}
+
+        except Exception as e:
+            _log.debug('request failed', exc_info=True)
+            return {'ok': False, 'error': '{}: {}'.format(
+                type(e).__name__, e)}
+
+        return {'ok': True, 'value': value}
+
+    async def start(self, host=None, port=None, path=None):
+        if path is not None:
+            return await asyncio.start_unix_server(self.handle, path)
+
+        return await asyncio.start_server(
+            self.handle, host or '127.0.0.1', port)
+
+
+class Client(object):
+    """
+    Minimal blocking client.
+    """
+
+    def __init__(self, host='127.0.0.1', port=None, path=None):
+        if path is not None:
+            self._sock = socket.socket(socket.AF_UNIX)
+            self._sock.connect(path)
+
+        else:
+            self._sock = socket.create_connection((host, port))
+
+        self._file = self._sock.makefile('rwb')
+
+    def request(self, **request):
+        self._file.write(json.dumps(request).encode() + b'\n')
+        self._file.flush()
+        response = json.loads(self._file.readline())
+
+        if not response['ok']:
+            raise RuntimeError(response['error'])
+
+        return response['value']
+
+    def eval(self, source, timeout=None):
+        return self.request(source=source, timeout=timeout)
+
+    def call(self, name, *args, timeout=None):
+        return self.request(call=name, args=list(args), timeout=timeout)
+
+    def close(self):
+        self._file.close()
+        self._sock.close()
+
+
+async def load(requests, concurrency=32, host='127.0.0.1', port=None,
+               path=None):
+    """
+    Send ``requests`` over ``concurrency`` connections and return
+    per-request latencies and total elapsed time.
+    """
+    queue = list(reversed(requests))
+    latencies = []
+
+    async def worker():
+        if path is not None:
+            reader, writer = await asyncio.open_unix_connection(path)
+
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+
+        try:
+            while queue:
+                request = queue.pop()
+                start = time.perf_counter()
+                writer.write(json.dumps(request).encode() + b'\n')
+                await writer.drain()
+                await reader.readline()
+                latencies.append(time.perf_counter() - start)
+
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, time.perf_counter() - start
+
+
+def summarize(latencies, elapsed):
+    latencies = sorted(latencies)
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))]
+
+    return {
+        'requests': len(latencies),
+        'rps': len(latencies) / elapsed,
+        'p50_ms': percentile(0.5) * 1000,
+        'p99_ms': percentile(0.99) * 1000,
+    }
+
+
+def main():
+    argparser = ArgumentParser("Silly Python Lisp server")
+    argparser.add_argument('--host', default='127.0.0.1')
+    argparser.add_argument('--port', type=int, default=8765)
+    argparser.add_argument('--unix', help="Unix socket path")
+    sub = argparser.add_subparsers(dest='command', required=True)
+
+    serve = sub.add_parser('serve', help="run the server")
+    serve.add_argument('--pool', type=int, default=4)
+    serve.add_argument('--timeout', type=float, default=None)
+    serve.add_argument('--load', help="library source to warm up with")
+    serve.add_argument('--image', help="image to warm up with")
+
+    bench = sub.add_parser('load', help="load generator")
+    bench.add_argument('source')
+    bench.add_argument('-n', '--requests', type=int, default=1000)
+    bench.add_argument('-c', '--concurrency', type=int, default=32)
+
+    args = argparser.parse_args()
+    address = dict(host=args.host, port=args.port, path=args.unix)
+
+    if args.command == 'load':
+        latencies, elapsed = asyncio.run(load(
+            [{'source': args.source}] * args.requests,
+            args.concurrency, **address))
+        print(json.dumps(summarize(latencies, elapsed)))
+        return
+
+    async def serve_forever():
+        source = None
+
+        if args.load:
+            with open(args.load) as f:
+                source = f.read()
+
+        pool = Pool(args.pool, source=source, image=args.image,
+                    timeout=args.timeout)
+        server = await Server(pool).start(**address)
+
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(serve_forever())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+Memory-mapped S-expression data files. Top-level forms are located by a
+single scan that records their byte offsets, and are parsed one at a time
+only when accessed. The offset index is stored next to the file and reused
+for as long as the file is unchanged.
+"""
+from __future__ import absolute_import, division, print_function
+
+from array import array
+import logging
+import mmap
+import os
+import re
+import struct
+
+from .compiler import Compiler
+
+_log = logging.getLogger(__name__)
+
+INDEX_SUFFIX = '.idx'
+INDEX_MAGIC = b'PLIDX\x01'
+
+_header = struct.Struct('<QQ')
+
+# Strings, comments, parentheses, quotes and atoms
+_TOKEN = re.compile(rb'"(?:\\.|[^"\\])*"?|;[^\n]*|[()\']|[^\s()";\']+')
+
+
+def scan(buffer):
+    """
+    Return an array of interleaved start and end offsets of the top-level
+    forms in ``buffer``.
+    """
+    offsets = array('Q')
+    depth = 0
+    start = None
+
+    for match in _TOKEN.finditer(buffer):
+        token = match.group()
+
+        if token[0] == 0x3b:  # ;
+            continue
+
+        if start is None:
+            start = match.start()
+
+        if token == b'(':
+            depth += 1
+            continue
+
+        if token == b')':
+            depth -= 1
+
+            if depth < 0:
+                raise SyntaxError(
+                    'unexpected end of list at {}'.format(match.start()))
+
+        elif token == b"'":
+            continue
+
+        if depth == 0:
+            offsets.append(start)
+            offsets.append(match.end())
+            start = None
+
+    if start is not None:
+        raise SyntaxError('unexpected EOF')
+
+    return offsets
+
+
+class SexpFile(object):
+
+    def __init__(self, path, index=True):
+        self.path = path
+        self._file = open(path, 'rb')
+        stat = os.fstat(self._file.fileno())
+        self._stamp = (stat.st_size, stat.st_mtime_ns)
+
+        if stat.st_size:
+            self._buffer = mmap.mmap(self._file.fileno(), 0,
+                                     access=mmap.ACCESS_READ)
+
+        else:
+            self._buffer = b''
+
+        self._offsets = None
+        self._persist = index
+
+    @property
+    def index_path(self):
+        return self.path + INDEX_SUFFIX
+
+    @property
+    def offsets(self):
+        if self._offsets is None:
+            self._offsets = self._load_index()
+
+            if self._offsets is None:
+                self._offsets = scan(self._buffer)
+
+                if self._persist:
+                    self._save_index()
+
+        return self._offsets
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, 'rb') as f:
+                data = f.read()
+
+        except OSError:
+            return None
+
+        magic_end = len(INDEX_MAGIC)
+        body = data[magic_end + _header.size:]
+        offsets = array('Q')
+
+        # The index is only a cache, anything unexpected means rescanning
+        if (len(data) < magic_end + _header.size or
+                data[:magic_end] != INDEX_MAGIC or
+                _header.unpack_from(data, magic_end) != self._stamp or
+                len(body) % (2 * offsets.itemsize)):
+            return None
+
+        offsets.frombytes(body)
+
+        if offsets and (max(offsets) > len(self._buffer) or
+                        any(offsets[i] > offsets[i + 1]
+                            for i in range(0, len(offsets), 2))):
+            return None
+
+        return offsets
+
+    def _save_index(self):
+        tmp = '{}.{}.tmp'.format(self.index_path, os.getpid())
+
+        try:
+            with open(tmp, 'wb') as f:
+                f.write(INDEX_MAGIC)
+                f.write(_header.pack(*self._stamp))
+                f.write(self._offsets.tobytes())
+
+            os.replace(tmp, self.index_path)
+
+        except OSError:
+            _log.debug('could not write index %s', self.index_path,
+                       exc_info=True)
+
+    def __len__(self):
+        return len(self.offsets) // 2
+
+    def __getitem__(self, index):
+        length = len(self)
+
+        if index < 0:
+            index += length
+
+        if not 0 <= index < length:
+            raise IndexError('form index out of range')
+
+        start = self.offsets[2 * index]
+        end = self.offsets[2 * index + 1]
+        source = str(self._buffer[start:end], 'utf-8')
+        # Compiler wraps forms in (begin ...)
+        return Compiler(source).compile().cdr.car
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def close(self):
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
+
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __repr__(self):
+        return '#<SexpFile {}>'.format(self.path)
+
+
+def read_forms(path):
+    """
+    Iterate over the forms of the file at ``path``. The file is closed
+    once iteration ends, or when the iterator is discarded.
+    """
+    forms = SexpFile(path)
+
+    try:
+        yield from forms
+
+    finally:
+        forms.close()
@@ -6,6 +6,7 @@ def tests():
     from .parser import Parser
     from .interpreter import Interpreter
     from .compiler import Compiler
+    from . import types
 
     p = Parser("""
     (asdf    1 2 3 4 5  1e66 "asdf"     "qwer"   (asdf asdf asdf))
@@ -31,6 +32,508 @@ def tests():
     except NameError:
         pass
 
+    from . import lazy
+    evens = Interpreter().eval(Compiler("""
+        (stream->list
+          (stream-take 3
+            (stream-filter (lambda (x) (= (% x 2) 0))
+              (iter->stream (range 1000000000)))))
+    """).compile())
+    assert list(lazy.iterate(evens)) == [0, 2, 4]
+
+    assert Interpreter().eval(Compiler("""
+        (define count 0)
+        (define p (delay (begin (set! count (+ count 1)) count)))
+        (force p)
+        (force p)
+    """).compile()) == 1
+
+    memo = Interpreter()
+    assert memo.eval(Compiler("""
+        (define-memo (fib n) (if (< n 2) n (+ (fib (- n 1)) (fib (- n 2)))))
+        (fib 60)
+    """).compile()) == 1548008755920
+    stats = memo.eval(Compiler("(memo-stats fib)").compile())
+    assert stats['misses'] == 61 and stats['evictions'] == 0
+
+    stats = memo.eval(Compiler("""
+        (define first (memoize car 1))
+        (first '(1 2))
+        (first '(1 2))
+        (first '(2))
+        (memo-stats first)
+    """).compile())
+    assert (stats['hits'], stats['misses'], stats['evictions']) == (1, 2, 1)
+
+    stats = memo.eval(Compiler("""
+        (define-memo (size xs) :maxsize 1 (car xs))
+        (define x (list 1 2))
+        (size (list x x))
+        (size (list x x))
+        (size x)
+        (memo-stats size)
+    """).compile())
+    assert (stats['hits'], stats['misses'], stats['evictions']) == (1, 2, 1)
+    assert stats['maxsize'] == 1
+
+    nested = None
+
+    for _ in range(5000):
+        nested = types.Cons(nested, None)
+
+    memo._globals['nested'] = nested
+    stats = memo.eval(Compiler("""
+        (size nested)
+        (memo-stats size)
+    """).compile())
+    assert stats['misses'] == 2 and stats['size'] == 1
+
+    import asyncio
+    from .aio import AsyncInterpreter
+
+    async def double(n):
+        await asyncio.sleep(0)
+        return n * 2
+
+    aio = AsyncInterpreter()
+    aio._envs['double'] = double
+    aio.eval(Compiler("""
+        (define f (lambda (n) (let ((x (await (double n)))) (+ x 1))))
+    """).compile())
+
+    async def run():
+        return await asyncio.gather(*(
+            aio.eval_async(Compiler("(f {})".format(n)).compile())
+            for n in range(10)))
+
+    assert asyncio.run(run()) == [n * 2 + 1 for n in range(10)]
+    # Procedures called back from Python builtins run on the task
+    assert asyncio.run(aio.eval_async(Compiler("""
+        (list (stream->list (stream-map (lambda (x) (let ((y (* x 10))) y))
+                                        (iter->stream (range 3))))
+              (with-output-to-string (lambda () (print 1))))
+    """).compile())).cdr.car == '1\n'
+    assert list(lazy.iterate(asyncio.run(aio.eval_async(Compiler(
+        "(stream->list (stream-map (lambda (x) (let ((y x)) y)) "
+        "(iter->stream (range 3))))").compile())))) == [0, 1, 2]
+
+    import os
+    import tempfile
+    from . import views
+
+    fd, path = tempfile.mkstemp(suffix='.img')
+    os.close(fd)
+
+    try:
+        imaged = Interpreter()
+        imaged._globals['rows'] = views.view([1, 2, 3])
+        imaged.eval(Compiler("""
+            (define (square x) (* x x))
+            (define k 7)
+            (define data '(a b a))
+            (define tail (cdr rows))
+            (save-image "{}")
+        """.format(path)).compile())
+
+        restored = Interpreter.load_image(path)
+        assert restored.eval(Compiler("(square k)").compile()) == 49
+        assert restored.eval(Compiler(
+            "(eq? (car data) (car (cdr (cdr data))))").compile())
+        assert views.to_python(restored._globals['tail']) == [2, 3]
+
+    finally:
+        os.unlink(path)
+
+    import json
+    from .server import Pool, Server
+
+    path = os.path.join(tempfile.mkdtemp(), 'pylisp.sock')
+
+    async def serve():
+        pool = Pool(1, source="""
+            (define k 1)
+            (define-memo (f x) (* x k))
+        """)
+        server = await Server(pool).start(path=path)
+
+        async with server:
+            reader, writer = await asyncio.open_unix_connection(path)
+            responses = []
+
+            for request in ({'source': '(define k 2) k'},
+                            {'source': 'k'},
+                            {'call': 'car', 'args': [[1, 2]]},
+                            {'source': '(set! k 100) (f 1)'},
+                            {'call': 'f', 'args': [1]}):
+                writer.write(json.dumps(request).encode() + b'\n')
+                responses.append(json.loads(await reader.readline()))
+
+            writer.close()
+            await writer.wait_closed()
+            # Let the server notice the connection closing
+            await asyncio.sleep(0.01)
+
+        pool.close()
+        return [r['value'] for r in responses]
+
+    try:
+        assert asyncio.run(serve()) == [2, 1, 1, 100, 1]
+
+    finally:
+        os.unlink(path)
+        os.rmdir(os.path.dirname(path))
+
+    tiered = Interpreter()
+    tiered.tier_threshold = 3
+    assert tiered.eval(Compiler("""
+        (define (fib n) (if (< n 2) n (+ (fib (- n 1)) (fib (- n 2)))))
+        (define (g x) (let ((a (* x 2)) (b (+ a 1))) b))
+        (define (h x) (define y x) y)
+        (list (fib 15) (g 1) (g 2) (g 3) (g 4) (h 1) (h 2) (h 3) (h 4))
+    """).compile()) is not None
+    assert [name for name, _ in tiered.promoted] == ['fib', 'g']
+    assert tiered.eval(Compiler("(list (fib 15) (g 4))").compile()).car == 610
+    assert tiered.eval(Compiler("h").compile()).compiled is False
+    tiered.eval(Compiler("""
+        (define (make) (lambda (x) x))
+        (do ((i 0 (+ i 1))) ((= i 1200)) (let ((f (make))) (f i) (f i) (f i)))
+    """).compile())
+    assert len(tiered.promoted) == tiered.promoted_maxlen
+    assert tiered.promoted[-1] == (None, 3)
+
+    from .exceptions import FuelExhausted, AllocationLimitExceeded
+
+    limited = Interpreter()
+    limited.eval(Compiler("""
+        (define (fib n) (if (< n 2) n (+ (fib (- n 1)) (fib (- n 2)))))
+        (define (build n acc) (if (= n 0) acc (build (- n 1) (cons n acc))))
+    """).compile())
+    envs = limited._envs
+
+    for limits, source, error in (({'fuel': 1000}, "(fib 25)", FuelExhausted),
+                                  ({'conses': 10}, "(build 50 nil)",
+                                   AllocationLimitExceeded),
+                                  ({'fuel': 1000}, "(let loop () (loop))",
+                                   FuelExhausted)):
+        try:
+            with limited.limits(**limits):
+                limited.eval(Compiler(source).compile())
+
+        except error:
+            pass
+
+        else:
+            assert False, 'limit not enforced'
+
+    assert limited._envs is envs
+    assert limited.eval(Compiler("(fib 10)").compile()) == 55
+
+    from . import binary
+
+    data = Interpreter().eval(Compiler("""
+        '(a b (1 -2 3.5 "x") 123456789012345678901234567890 a)
+    """).compile())
+    decoded, number = binary.Reader(memoryview(binary.dumps(data, -7)))
+    assert number == -7
+    assert list(lazy.iterate(decoded.cdr.cdr.car)) == [1, -2, 3.5, 'x']
+    assert decoded.cdr.cdr.cdr.car == 123456789012345678901234567890
+    assert decoded.car is decoded.cdr.cdr.cdr.cdr.car
+    cyclic = types.Cons(1, types.Cons(2, None))
+    cyclic.cdr.cdr = cyclic
+
+    try:
+        binary.dumps(cyclic)
+        assert False, 'cyclic list serialized'
+
+    except ValueError:
+        pass
+
+    shared = types.Cons(1, None)
+    decoded = binary.loads(binary.dumps(types.Cons(shared, shared)))
+    assert decoded.car.car == decoded.cdr.car == 1
+    from .memo import key
+
+    rows = types.Cons(0, views.view(list(range(1, 10))))
+    assert views.to_python(binary.loads(binary.dumps(rows))) == list(range(10))
+    assert key(rows) == key(lazy.to_list(list(range(10))))
+
+    import shutil
+    from . import modules
+    from .sexpfile import SexpFile, read_forms
+
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'data.spl')
+
+    with open(path, 'w') as f:
+        f.write('; comment\n(a "b (c)" (d))\n42 foo\n\'(e f)\n')
+
+    try:
+        with SexpFile(path) as forms:
+            assert len(forms) == 4
+            assert forms[1] == 42
+            assert forms[-1].car.name == 'quote'
+            assert forms[0].cdr.car == 'b (c)'
+
+        assert os.path.exists(path + '.idx')
+
+        with SexpFile(path) as forms:
+            assert forms._load_index() is not None
+            assert forms[2].name == 'foo'
+
+        with open(path + '.idx', 'rb') as f:
+            index = f.read()
+
+        # Damaged indexes are rescanned and rewritten
+        for damaged in (index[:8], index[:-3], index[:-8] + b'\xff' * 8):
+            with open(path + '.idx', 'wb') as f:
+                f.write(damaged)
+
+            with SexpFile(path) as forms:
+                assert len(forms) == 4 and forms[2].name == 'foo'
+
+        with open(path + '.idx', 'rb') as f:
+            assert f.read() == index
+
+        reader = Interpreter()
+        reader._globals['path'] = path
+        assert reader.eval(Compiler("""
+            (stream-car (stream-cdr (read-file path)))
+        """).compile()) == 42
+        assert len(list(lazy.iterate(reader.eval(Compiler("""
+            (stream->list (read-file path))
+        """).compile())))) == 4
+
+        forms = read_forms(path)
+        next(forms)
+        opened = forms.gi_frame.f_locals['forms']
+        assert len(list(forms)) == 3 and opened._file.closed
+
+    finally:
+        for name in os.listdir(directory):
+            os.unlink(os.path.join(directory, name))
+
+        os.rmdir(directory)
+
+    from . import printer
+
+    cyclic = Interpreter().eval(Compiler("""
+        (define x (list 1 "two" 'three))
+        (define y (cdr (cdr x)))
+        (set-cdr! y x)
+        x
+    """).compile())
+    assert repr(cyclic) == '#0=(1 "two" three . #0#)'
+
+    deep = None
+
+    for _ in range(100000):
+        deep = types.Cons(deep)
+
+    assert printer.to_string(deep, labels=False).startswith('((((')
+    assert repr(Parser('(a (b c) "d" 1.5)').parse()) == '(a (b c) "d" 1.5)'
+    quoted = types.Cons('a"b\\c', types.Cons('', None))
+    assert printer.to_string(quoted) == '("a\\"b\\\\c" "")'
+    assert repr(Interpreter().eval(Compiler(
+        "'" + printer.to_string(quoted)).compile())) == repr(quoted)
+
+    assert Interpreter().eval(Compiler("""
+        (define in (open-input-string "ab"))
+        (with-output-to-string
+          (lambda ()
+            (print 1 '(a b) "c d" '("e") nil)
+            (write-string (read-char in))
+            (write (read-char in))
+            (write (read-char in))))
+    """).compile()) == '1 (a b) c d ("e") nil\na"b"nil'
+
+    r, w = os.pipe()
+    os.write(w, b'ab\ncd')
+    os.close(w)
+
+    with open(r) as pipe:
+        piped = Interpreter()
+        piped._globals['in'] = pipe
+        assert list(lazy.iterate(piped.eval(Compiler("""
+            (list (peek-char in) (read-char in) (peek-char in)
+                  (read-line in) (read-line in) (peek-char in))
+        """).compile()))) == ['a', 'a', 'b', 'b', 'cd', None]
+
+    point = Interpreter().eval(Compiler("""
+        (define-record-type point
+          (make-point y x)
+          point?
+          (x point-x set-point-x!)
+          (y point-y))
+        (define p (make-point 1 2))
+        (set-point-x! p 10)
+        (list (point-x p) (point-y p) (point? p) (point? '(point 1 2)))
+    """).compile())
+    assert list(lazy.iterate(point)) == [10, 1, True, False]
+
+    directory = tempfile.mkdtemp()
+
+    with open(os.path.join(directory, 'mathx.spl'), 'w') as f:
+        f.write("""
+            (provide square loads)
+            (define loads 1)
+            (define (square x) (* x x))
+        """)
+
+    try:
+        for _ in range(2):  # compile, then from the module cache
+            modular = Interpreter()
+            modular.modules.path = [directory]
+            modular.tier_threshold = 1
+            modular.eval(Compiler("""
+                (require mathx square)
+                (define (nine) (square 3))
+            """).compile())
+            module = modular.modules.modules['mathx']
+            assert module.state == modules.UNLOADED
+            # Compiled on its first call, before the module has loaded
+            assert modular.eval(Compiler("(nine)").compile()) == 9
+            assert modular._globals['nine'].compiled
+            assert module.state == modules.LOADED
+            assert modular.eval(Compiler(
+                "(list (square 3) (mathx.square 4) mathx.loads)").compile()
+            ).car == 9
+            assert modular._globals['mathx.loads'] == 1
+
+            caller = Interpreter()
+            caller.modules.path = [directory]
+            caller.eval(Compiler("(require mathx square)").compile())
+            binding = caller._globals['square']
+            assert caller._callable(binding)(2) == 4
+            assert binding(3) == 9
+
+        cache = modules.Loader.cache_path(
+            os.path.join(directory, 'mathx.spl'))
+
+        with open(cache, 'rb') as f:
+            data = f.read()
+
+        # Damaged caches are recompiled
+        for damaged in (data[:10], data[:-5], data[:30] + b'\xff' * 8):
+            with open(cache, 'wb') as f:
+                f.write(damaged)
+
+            caller = Interpreter()
+            caller.modules.path = [directory]
+            assert caller.eval(Compiler(
+                "(require mathx square) (square 5)").compile()) == 25
+
+        with open(cache, 'rb') as f:
+            assert f.read() == data
+
+    finally:
+        shutil.rmtree(directory)
+
+    from .reload import Reloader
+
+    reloaded = Interpreter()
+    reloader = Reloader(reloaded)
+    version = """
+        (define (f x) (* x 2))
+        (define y (f 3))
+        (define z 1)
+        (define (unused) 1)
+    """
+    assert reloader.update(version)['evaluated'] == 4
+    version = version.replace('(* x 2)', '(* x 3)').replace(
+        '(define (unused) 1)', '')
+    assert reloader.update(version)['evaluated'] == 2
+    assert reloaded._globals['y'] == 9
+    assert 'unused' not in reloaded._globals
+    assert reloader.update(version)['evaluated'] == 0
+    reloader = Reloader(Interpreter())
+    version = "(define y 1) (set! y 5) (define z (* y 2))"
+    assert reloader.update(version)['evaluated'] == 3
+    assert reloader.update(version.replace('5', '6'))['evaluated'] == 2
+    assert reloader.interpreter._globals['z'] == 12
+    assert reloader.update(version.replace('1', '2'))['evaluated'] == 3
+    assert reloader.interpreter._globals['z'] == 10
+
+    from array import array
+
+    viewer = Interpreter()
+    viewer._globals['rows'] = views.view(list(range(10)))
+    viewer._globals['nums'] = views.view(memoryview(array('d', [1.5, 2.5])))
+    assert viewer.eval(Compiler("""
+        (set-car! nums 3.5)
+        (list (car (cdr (cdr rows))) (list->seq (cdr rows)) (car nums))
+    """).compile()).cdr.car == list(range(1, 10))
+    assert repr(viewer._globals['nums']) == '(3.5 2.5)'
+    assert list(lazy.iterate(binary.loads(binary.dumps(
+        viewer._globals['rows'])))) == list(range(10))
+
+    from .aio import AsyncInterpreter
+    from .compiler import PyCompiler
+
+    loops = """
+        (define (count n) (do ((i 0 (+ i 1))) ((= i n) i)))
+        (define (total n)
+          (let loop ((i 0) (acc 0))
+            (if (= i n) acc (loop (+ i 1) (+ acc i)))))
+        (define r (list (count 100) (total 10)))
+    """
+    recursive = """
+        (define (depth n)
+          (let f ((n n)) (if (= n 0) 0 (+ 1 (f (- n 1))))))
+        (define r (list (count 100) (total 10) (depth 10)))
+    """
+    looped = Interpreter()
+    looped.eval(Compiler(loops + recursive).compile())
+    assert list(lazy.iterate(looped._globals['r'])) == [100, 45, 10]
+    looped = AsyncInterpreter()
+    asyncio.run(looped.eval_async(Compiler(loops + recursive).compile()))
+    assert list(lazy.iterate(looped._globals['r'])) == [100, 45, 10]
+    looped = Interpreter()
+    looped.tier_threshold = 1
+    looped.eval(Compiler(loops + loops).compile())
+    assert list(lazy.iterate(looped._globals['r'])) == [100, 45]
+    assert looped._globals['count'].compiled
+    namespace = dict(Interpreter()._globals)
+    exec(PyCompiler(loops).compile(), namespace)
+    assert list(lazy.iterate(namespace['r'])) == [100, 45]
+    namespace = dict(Interpreter()._globals)
+    exec(PyCompiler("""
+        (define y 5)
+        (define z 7)
+        (define (f x) (+ (let ((x 10)) x) x))
+        (define (g) (+ y (let ((y 1)) y)))
+        (let ((z 2)) z)
+        (define r (list (f 1) (g) z))
+    """).compile(), namespace)
+    assert list(lazy.iterate(namespace['r'])) == [11, 6, 7]
+    closures = """
+        (define (thunks) (do ((i 0 (+ i 1)) (acc nil (cons (lambda () i) acc)))
+                             ((= i 3) acc)))
+        (define (named) (let loop ((i 0) (acc nil))
+                          (if (= i 3) acc (loop (+ i 1) (cons (delay i) acc)))))
+        (define r (list ((car (thunks))) (force (car (cdr (named))))))
+    """
+    looped = Interpreter()
+    looped.eval(Compiler(closures).compile())
+    assert list(lazy.iterate(looped._globals['r'])) == [2, 1]
+    looped = AsyncInterpreter()
+    asyncio.run(looped.eval_async(Compiler(closures).compile()))
+    assert list(lazy.iterate(looped._globals['r'])) == [2, 1]
+    from . import harness
+
+    report = harness.run(list(harness.generate(10, seed=0)) + [
+        ('quoted', '(define result (quote 1))'),
+        ('procedure', '(define (f x) x) (define result f)'),
+        ('recursive', recursive.replace('(count 100) (total 10) ', '')),
+    ], memory=False)
+    assert not report.divergences()
+    totals = report.totals()
+    assert totals['pycompiler']['unsupported'] == 1
+    assert totals['interpreter']['errors'] == 0
+    assert len(report.results[-2].outcomes) == len(harness.ENGINES)
+    assert report.results[-2].outcomes[0].value == '#<procedure>'
+    report = harness.run([('quoted', '(define result (quote 1))')])
+    assert all(o.peak > 0 for o in report.results[0].outcomes)
+
 
 if __name__ == '__main__':
     tests()
@@ -95,6 +95,16 @@ class Tokenizer(object):
         if self._string:
             self._string[0].append(chr_)
 
+    def _escaped(self):
+        # Odd number of backslashes before the current character
+        chars = self._string[0]
+        n = 0
+
+        while n < len(chars) and chars[-1 - n] == '\\':
+            n += 1
+
+        return n % 2 == 1
+
     def _flush_string(self):
         return self._flush('_string', STRING)
 
@@ -144,7 +154,7 @@ class Tokenizer(object):
 
             elif chr_ == self._STRING:
                 if self._string:
-                    if not self._string[0][-1] == '\\':
+                    if not self._escaped():
                         yield self._flush_string()
 
                     else:
@@ -8,7 +8,7 @@ class Recur(object):
 
 class Procedure(object):
 
-    __slots__ = ('name', 'args', 'body', 'env')
+    __slots__ = ('name', 'args', 'body', 'env', 'calls', 'compiled')
 
     def __init__(self, name, args, body, env):
         if not body:
@@ -18,6 +18,19 @@ class Procedure(object):
         self.args = args
         self.body = body
         self.env = env
+        # Call count and compiled Python function for tiered execution.
+        # compiled is None until tried, False if the body is unsupported.
+        self.calls = 0
+        self.compiled = None
+
+    def __getstate__(self):
+        # Compiled functions are not picklable, they are rebuilt on demand
+        return self.name, self.args, self.body, self.env
+
+    def __setstate__(self, state):
+        self.name, self.args, self.body, self.env = state
+        self.calls = 0
+        self.compiled = None
 
 
 class Continuation(object):
@@ -50,7 +63,8 @@ class Cons(object):
         self.cdr = cdr
 
     def __repr__(self):
-        return '({})'.format(' '.join(self))
+        from .printer import to_string
+        return to_string(self)
 
     def __iter__(self):
         value = self
@@ -58,3 +72,32 @@ class Cons(object):
         while isinstance(value, Cons):
             yield value
             value = value.cdr
+
+
+class Promise(object):
+    """
+    Memoized delayed computation. The thunk is dropped after forcing so
+    that whatever it closed over can be collected.
+    """
+
+    __slots__ = ('thunk', 'value', 'forced')
+
+    def __init__(self, thunk):
+        self.thunk = thunk
+        self.value = None
+        self.forced = False
+
+    def force(self):
+        if not self.forced:
+            value = self.thunk()
+
+            # Forcing may have re-entered and forced this promise already
+            if not self.forced:
+                self.value = value
+                self.forced = True
+                self.thunk = None
+
+        return self.value
+
+    def __repr__(self):
+        return '#<Promise {}>'.format('forced' if self.forced else 'pending')
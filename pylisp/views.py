@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+Cons views over Python sequences. A view is a :class:`~.types.Cons` whose
+car and cdr are computed from a sequence and an index, so lists, tuples,
+``array`` and ``memoryview`` data can be passed to Lisp code without
+building cons cells or copying the data.
+"""
+from __future__ import absolute_import, division, print_function
+
+from itertools import islice
+
+from .types import Cons
+
+
+class SeqView(Cons):
+    """
+    The list of ``seq[index:]``. Cells are created as ``cdr`` is taken and
+    are not kept, so ``(eq? (cdr x) (cdr x))`` is false for views.
+    """
+
+    __slots__ = ('seq', 'index')
+
+    def __init__(self, seq, index=0):
+        self.seq = seq
+        self.index = index
+
+    @property
+    def car(self):
+        return self.seq[self.index]
+
+    @car.setter
+    def car(self, value):
+        self.seq[self.index] = value
+
+    @property
+    def cdr(self):
+        index = self.index + 1
+
+        if index < len(self.seq):
+            return SeqView(self.seq, index)
+
+        return None
+
+    @cdr.setter
+    def cdr(self, value):
+        raise TypeError('cannot set the cdr of a sequence view')
+
+    def __reduce__(self):
+        # The slots inherited from Cons are not state of a view
+        return SeqView, (self.seq, self.index)
+
+    def values(self):
+        """
+        Iterate over the elements without creating cells.
+        """
+        if self.index:
+            return islice(self.seq, self.index, None)
+
+        return iter(self.seq)
+
+
+def view(seq):
+    """
+    View ``seq`` as a list, nil if it is empty.
+    """
+    if len(seq):
+        return SeqView(seq)
+
+    return None
+
+
+def to_python(obj):
+    """
+    Convert a list to a Python list in a single pass.
+    """
+    if isinstance(obj, SeqView):
+        return list(obj.values())
+
+    values = []
+
+    while isinstance(obj, Cons):
+        values.append(obj.car)
+        obj = obj.cdr
+
+    return values